@@ -7,6 +7,8 @@ Part of Suki AI internship demonstration - basic LLM integration.
 import openai
 import requests
 import json
+import os
+import sys
 import time
 import logging
 from typing import Dict, List, Optional, Any, Tuple
@@ -15,6 +17,9 @@ import asyncio
 import aiohttp
 from dataclasses import asdict
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from resilience import Resilience
+
 from medical_data_structures import (
     MedicalDocument, PatientDemographics, Medication, Diagnosis, 
     VitalSigns, Procedure, LabResult, ExtractionConfidence,
@@ -54,6 +59,11 @@ class LLMAPIProcessor:
         self.max_tokens = 2000
         self.temperature = 0.1  # Low temperature for consistent medical extraction
         self.request_timeout = 60
+        self.max_retries = 3
+        
+        # Retries with jittered backoff on 429/5xx, rate limiting and a circuit breaker;
+        # the whole call (retries included) is bounded by twice the per-request timeout
+        self.resilience = Resilience(max_retries=self.max_retries, timeout_seconds=2 * self.request_timeout)
         
         if self.verbose_mode:
             logger.info("Initializing LLMAPIProcessor...")
@@ -129,7 +139,8 @@ Please extract the requested information now:
         try:
             # Simulate API call (replace with actual OpenAI call when API key is available)
             if self.api_key:
-                response = openai.ChatCompletion.create(
+                response = self.resilience.call(
+                    openai.ChatCompletion.create,
                     model=model,
                     messages=[
                         {"role": "system", "content": "You are a medical information extraction specialist."},
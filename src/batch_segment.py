@@ -0,0 +1,156 @@
+"""
+Batch Segmentation - segment archived transcripts across a process pool
+
+Each worker loads the sentence encoder once (pool initializer) with its torch /
+onnxruntime thread count capped, so workers x threads never exceeds the cores available.
+Segmented dialogues are streamed to a JSONL file as transcripts complete.
+
+Usage:
+    python batch_segment.py <transcript_dir | transcripts.jsonl> <output.jsonl> [options]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+# set in each worker by _init_worker
+_streaming = None
+_incremental = False
+
+
+def iter_tasks(source):
+    """Yield (transcript_id, path, text) from a directory of .txt files or a JSONL file.
+
+    Directory entries are passed by path so workers read them; JSONL records
+    ({"id": ..., "text": ...}) carry their text.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.txt'):
+                yield name, os.path.join(source, name), None
+    else:
+        with open(source, 'r') as f:
+            for line_no, line in enumerate(f):
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.get('id', line_no), None, record['text']
+
+
+def _init_worker(threads, incremental, model_name, backend, cache_path):
+    """Load the model once per worker with a capped torch thread pool"""
+    global _streaming, _incremental
+
+    # must be set before torch is imported
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    if model_name:
+        os.environ['STREAMING_MODEL'] = model_name
+    if backend:
+        os.environ['STREAMING_BACKEND'] = backend
+    if cache_path is not None:
+        os.environ['STREAMING_EMBEDDING_CACHE'] = cache_path
+
+    import streaming
+    if streaming.BACKEND == streaming.DEFAULT_BACKEND:
+        # only the PyTorch backend needs torch; ONNX workers read OMP_NUM_THREADS
+        import torch
+        torch.set_num_threads(threads)
+    streaming.warm_up()
+    _streaming = streaming
+    _incremental = incremental
+
+
+def _segment_one(task):
+    transcript_id, path, text = task
+    start = time.time()
+    try:
+        if text is None:
+            interactions = [i.text for i in _streaming.iter_transcript_file(path, use_mmap=True)]
+        else:
+            interactions = _streaming.parse_interactions(text)
+        dialogues = _streaming.get_disjoint_dialogues(interactions, incremental=_incremental)
+        return {
+            "id": transcript_id,
+            "turns": len(interactions),
+            "dialogues": dialogues,
+            "seconds": round(time.time() - start, 3)
+        }
+    except Exception as e:
+        return {"id": transcript_id, "error": str(e)}
+
+
+def run_batch(source, output_path, workers=None, threads_per_worker=1,
+              incremental=False, model_name=None, backend=None, cache_path=None,
+              chunksize=4, report_every=100):
+    """Segment every transcript in source, writing one JSON line per transcript"""
+    cores = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cores // threads_per_worker)
+
+    start = time.time()
+    done = failed = turns = 0
+
+    with open(output_path, 'w') as out, Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(threads_per_worker, incremental, model_name, backend, cache_path)
+    ) as pool:
+        for result in pool.imap_unordered(_segment_one, iter_tasks(source), chunksize=chunksize):
+            out.write(json.dumps(result) + "\n")
+            done += 1
+            if "error" in result:
+                failed += 1
+            else:
+                turns += result["turns"]
+
+            if done % report_every == 0:
+                out.flush()
+                elapsed = time.time() - start
+                print(f"{done} transcripts, {done / elapsed:.1f}/s, {turns / elapsed:.0f} turns/s", file=sys.stderr)
+
+    elapsed = time.time() - start
+    stats = {
+        "transcripts": done,
+        "failed": failed,
+        "turns": turns,
+        "seconds": round(elapsed, 2),
+        "transcripts_per_second": round(done / elapsed, 2) if elapsed > 0 else 0,
+        "turns_per_second": round(turns / elapsed, 1) if elapsed > 0 else 0,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker
+    }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment archived transcripts into dialogues")
+    parser.add_argument("source", help="directory of .txt transcripts or JSONL with id/text records")
+    parser.add_argument("output", help="JSONL file to write segmented dialogues to")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: cores / threads per worker)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch threads per process")
+    parser.add_argument("--incremental", action="store_true", help="use incremental centroid segmentation")
+    parser.add_argument("--model", default=None, help="model alias or name (see streaming.MODEL_ALIASES)")
+    parser.add_argument("--backend", default=None, help="embedding backend (see embedding_backends.BACKENDS)")
+    parser.add_argument("--cache-path", default=None, help="embedding cache file ('' for memory only)")
+    parser.add_argument("--chunksize", type=int, default=4, help="transcripts handed to a worker at a time")
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.source, args.output,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        incremental=args.incremental,
+        model_name=args.model,
+        backend=args.backend,
+        cache_path=args.cache_path,
+        chunksize=args.chunksize
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Segmentation Benchmark - synthetic transcripts and timing for get_disjoint_dialogues
+
+Generates seeded nurse/patient transcripts in the same shape as
+outputs/sample_scripts/disjoint_stress_transcript.txt (markdown speaker labels,
+one NURSE -> PATIENT exchange per interaction, topic threads that interleave and
+return to earlier threads) and measures each segmentation mode on them. Every
+interaction is distinct (answers carry slot-filled details such as times and
+readings) and the embedding cache is off, so each turn costs a real encode.
+
+Every (size, mode) case runs in a fresh process so peak RSS is per case. The
+model load happens before timing starts. A "turn" here is one interaction.
+
+Usage:
+    python benchmark_segmentation.py [--sizes 100 1000 10000] [--modes ...]
+                                     [--save-baseline FILE] [--check-baseline FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# home-health visit threads: (nurse prompts, patient answers)
+TOPICS = {
+    "pain": (
+        ["Any pain today?", "Where does it hurt the most?", "On a scale of 0 to 10, how bad is the pain?",
+         "Is the pain worse in the morning or at night?", "Did the pain medicine help?"],
+        ["My right knee has been aching since yesterday.", "It's about a six, worse when I climb stairs.",
+         "The lower back pain comes and goes.", "The Tylenol takes the edge off for a few hours.",
+         "It's sharp when I first stand up."]
+    ),
+    "medications": (
+        ["Are you taking your metformin twice a day?", "Any side effects from the new blood pressure pill?",
+         "Who fills your pill organizer?", "Did you pick up the refill from the pharmacy?",
+         "Are you still taking the water pill in the morning?"],
+        ["My daughter fills the organizer every Sunday.", "I missed the evening dose a couple of times.",
+         "The lisinopril makes me a little dizzy.", "The pharmacy said the refill is ready Friday.",
+         "Yes, the furosemide every morning with breakfast."]
+    ),
+    "wound_care": (
+        ["How does the dressing on your leg look?", "Any drainage or redness around the wound?",
+         "When was the dressing last changed?", "Is the wound painful to touch?"],
+        ["There was a little yellow drainage this morning.", "The nurse changed it on Tuesday.",
+         "The skin around it looks pink but not hot.", "It itches more than it hurts."]
+    ),
+    "mobility": (
+        ["Have you had any falls since my last visit?", "Are you using the walker inside the house?",
+         "Can you get in and out of the shower on your own?", "How far can you walk before resting?"],
+        ["I almost fell getting out of bed on Monday.", "I use the walker but not in the bathroom.",
+         "My son helps me into the shower.", "I can make it to the mailbox and back."]
+    ),
+    "nutrition": (
+        ["What did you eat for breakfast?", "How is your appetite lately?",
+         "Are you drinking enough water?", "Have you been checking your blood sugar before meals?"],
+        ["Just toast and coffee this morning.", "I haven't felt like eating much this week.",
+         "Maybe three glasses of water a day.", "My sugar was 160 before lunch yesterday."]
+    ),
+    "sleep_mood": (
+        ["How have you been sleeping?", "Have you been feeling down or anxious?",
+         "Do you wake up short of breath at night?", "Are you napping during the day?"],
+        ["I wake up two or three times a night.", "I've been lonely since my wife passed.",
+         "I need two pillows to breathe comfortably.", "I nap after lunch most days."]
+    ),
+    "vitals": (
+        ["Let me check your blood pressure.", "I'm going to check your oxygen level now.",
+         "Have you weighed yourself this week?", "Any fever or chills?"],
+        ["Okay, my last reading at home was 150 over 90.", "My weight went up three pounds since Sunday.",
+         "No fever, just tired.", "My oxygen was 93 percent on the machine."]
+    ),
+    "home_safety": (
+        ["Are the rugs still in the hallway?", "Do you have grab bars in the bathroom?",
+         "Is there a night light between the bedroom and bathroom?", "Who can you call in an emergency?"],
+        ["We took the rugs up last week.", "The grab bar is on order.",
+         "There's a night light in the hall now.", "My neighbor checks on me every evening."]
+    ),
+}
+
+
+# topic-specific detail appended to each answer; slots are filled per turn
+DETAILS = {
+    "pain": "It was a {score} out of 10 around {time} on {day}.",
+    "medications": "I took the last dose at {time} on {day}.",
+    "wound_care": "The dressing was last changed at {time} on {day}.",
+    "mobility": "On {day} at {time} I walked for about {minutes} minutes.",
+    "nutrition": "My sugar was {glucose} at {time} on {day}.",
+    "sleep_mood": "I slept about {hours} hours on {day} night and woke at {time}.",
+    "vitals": "The home reading was {systolic} over {diastolic} at {time} on {day}.",
+    "home_safety": "My neighbor stopped by at {time} on {day}.",
+}
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _slot_values(rng: random.Random) -> Dict[str, object]:
+    return {
+        "time": f"{rng.randint(1, 12)}:{rng.randrange(0, 60, 5):02d} {rng.choice(['am', 'pm'])}",
+        "day": rng.choice(DAYS),
+        "score": rng.randint(0, 10),
+        "minutes": rng.randint(2, 45),
+        "glucose": rng.randint(80, 260),
+        "hours": rng.randint(2, 10),
+        "systolic": rng.randint(100, 180),
+        "diastolic": rng.randint(60, 100),
+    }
+
+
+def generate_transcript(turns: int, seed: int = 0, interleave: float = 0.3,
+                        revisit: float = 0.5, topics: List[str] = None) -> Tuple[str, List[str]]:
+    """Generate a seeded transcript of `turns` interactions.
+
+    interleave is the chance of leaving the current thread after each
+    interaction; revisit is the chance that a switch goes back to a thread
+    already discussed instead of opening a new one. Interactions are distinct,
+    so no encoder work is saved by deduplication. Returns (text, labels) with
+    the topic of each interaction.
+    """
+    rng = random.Random(seed)
+    topics = topics or list(TOPICS)
+    current = rng.choice(topics)
+    seen = [current]
+    used = set()
+    lines, labels = [], []
+
+    for _ in range(turns):
+        if rng.random() < interleave:
+            if len(seen) > 1 and rng.random() < revisit:
+                current = rng.choice([t for t in seen if t != current])
+            else:
+                current = rng.choice(topics)
+                if current not in seen:
+                    seen.append(current)
+        prompts, answers = TOPICS[current]
+        for _ in range(100):
+            prompt = rng.choice(prompts)
+            answer = f"{rng.choice(answers)} {DETAILS[current].format(**_slot_values(rng))}"
+            if (prompt, answer) not in used:
+                break
+        used.add((prompt, answer))
+        lines.append(f"**NURSE:** {prompt}")
+        lines.append(f"**PATIENT:** {answer}")
+        labels.append(current)
+
+    return "\n".join(lines), labels
+
+
+# segmentation modes: keyword arguments for DialogueSegmenter
+MODES = {
+    "reencode": {"incremental": False},
+    "incremental": {"incremental": True},
+    "incremental_window": {"incremental": True, "max_active": 16},
+    "incremental_int8": {"incremental": True, "embedding_dtype": "int8"},
+}
+
+
+def run_case(turns: int, mode: str, seed: int = 0, interleave: float = 0.3) -> Dict:
+    """Segment one synthetic transcript in one mode and measure it"""
+    import streaming
+
+    # measure the encoder, not the cache: no disk tier and no memory tier
+    streaming.EMBEDDING_CACHE_PATH = None
+    streaming.EMBEDDING_CACHE_MEMORY_ITEMS = 0
+    streaming.reset_embedding_cache()
+    streaming.warm_up()
+
+    model = streaming.get_model()
+    counts = {"calls": 0, "texts": 0}
+    encode = model.encode
+
+    def counting_encode(texts, *args, **kwargs):
+        counts["calls"] += 1
+        counts["texts"] += 1 if isinstance(texts, str) else len(texts)
+        return encode(texts, *args, **kwargs)
+
+    model.encode = counting_encode
+
+    text, labels = generate_transcript(turns, seed, interleave)
+    start = time.perf_counter()
+    sentences = streaming.parse_interactions(text)
+    embeddings = streaming.encode_sentences(sentences)
+    segmenter = streaming.DialogueSegmenter(**MODES[mode])
+    assignments = [segmenter.add(s, e).dialogue for s, e in zip(sentences, embeddings)]
+    elapsed = time.perf_counter() - start
+
+    model.encode = encode
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss_kb //= 1024  # bytes on macOS
+
+    return {
+        "turns": turns,
+        "mode": mode,
+        "encode_calls": counts["calls"],
+        "texts_encoded": counts["texts"],
+        "dialogues": len(segmenter.dialogues),
+        "rand_index": round(streaming.rand_index(labels, assignments), 4),
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 1) if elapsed > 0 else 0,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1)
+    }
+
+
+def _run_case_args(args):
+    return run_case(*args)
+
+
+def run_benchmark(sizes: List[int], modes: List[str], seed: int = 0, interleave: float = 0.3,
+                  max_reencode_turns: int = 10000, isolate: bool = True) -> List[Dict]:
+    """Run every (size, mode) case, each in its own process unless isolate=False"""
+    cases = [(turns, mode, seed, interleave) for turns in sizes for mode in modes
+             if not (mode == "reencode" and turns > max_reencode_turns)]
+    results = []
+    for case in cases:
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(1) as pool:
+                result = pool.apply(_run_case_args, (case,))
+        else:
+            result = run_case(*case)
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def check_baseline(results: List[Dict], baseline: List[Dict], tolerance: float = 0.2) -> List[str]:
+    """Compare against a saved baseline; returns a list of regressions"""
+    previous = {(r["turns"], r["mode"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["turns"], result["mode"]))
+        if old is None:
+            continue
+        case = f"{result['mode']} @ {result['turns']} turns"
+        if result["turns_per_second"] < old["turns_per_second"] * (1 - tolerance):
+            regressions.append(f"{case}: {result['turns_per_second']} turns/s vs {old['turns_per_second']}")
+        if result["encode_calls"] > old["encode_calls"]:
+            regressions.append(f"{case}: {result['encode_calls']} encode calls vs {old['encode_calls']}")
+        if result["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{case}: {result['peak_rss_mb']} MB peak RSS vs {old['peak_rss_mb']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript segmentation modes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--interleave", type=float, default=0.3, help="chance of switching thread per turn")
+    parser.add_argument("--max-reencode-turns", type=int, default=10000,
+                        help="skip the quadratic re-encode mode above this size")
+    parser.add_argument("--in-process", action="store_true", help="run cases in this process (shared peak RSS)")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--check-baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.modes, args.seed, args.interleave,
+                            args.max_reencode_turns, isolate=not args.in_process)
+
+    print(f"{'mode':<20}{'turns':>8}{'encodes':>10}{'seconds':>10}{'turns/s':>12}{'RSS MB':>10}{'rand':>8}")
+    for r in results:
+        print(f"{r['mode']:<20}{r['turns']:>8}{r['encode_calls']:>10}{r['seconds']:>10}"
+              f"{r['turns_per_second']:>12}{r['peak_rss_mb']:>10}{r['rand_index']:>8}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.check_baseline:
+        with open(args.check_baseline, "r") as f:
+            regressions = check_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
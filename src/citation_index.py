@@ -0,0 +1,166 @@
+"""
+Citation Index - verify citation quotes against the transcript and resolve offsets
+
+The transcript is normalized once (lowercase, punctuation and markup dropped,
+whitespace collapsed) with a map back to original character offsets. A quote
+is first looked up exactly, as whole words, in the normalized text (so "10 bpm"
+does not match inside "110 bpm"); if that fails, candidate
+positions are voted for through a word n-gram index and the best window is
+accepted when it is close enough to the quote. Quotes found neither way are
+treated as hallucinated.
+
+Usage:
+    index = TranscriptIndex(transcript)
+    match = index.verify(citation["source_quote"])
+    match.status, match.start, match.end
+"""
+
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+NGRAM_SIZE = 3
+# n-grams occurring more often than this are too common to locate a quote
+MAX_POSTINGS = 32
+# minimum word-level similarity of a fuzzy window to the quote
+FUZZY_THRESHOLD = 0.85
+# quotes elided with "..." are verified segment by segment
+ELLIPSIS_PATTERN = re.compile(r'\.\.\.+|…')
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+EXACT, FUZZY, NOT_FOUND = "exact", "fuzzy", "not_found"
+
+
+@dataclass
+class CitationMatch:
+    quote: str
+    status: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    score: float = 0.0
+
+    @property
+    def found(self) -> bool:
+        return self.status != NOT_FOUND
+
+
+def _lower(word: str) -> str:
+    lowered = word.lower()
+    # keep one character per character so offsets stay aligned (e.g. 'İ' lowers to two)
+    return lowered if len(lowered) == len(word) else ''.join(ch.lower()[0] for ch in word)
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercased alphanumeric runs of text"""
+    return [_lower(word) for word in WORD_PATTERN.findall(text)]
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """Lowercased alphanumeric runs joined by single spaces, and each character's original offset"""
+    words, offsets = [], []
+    for match in WORD_PATTERN.finditer(text):
+        if words:
+            offsets.append(match.start() - 1)
+        words.append(_lower(match.group()))
+        offsets.extend(range(match.start(), match.end()))
+    return ' '.join(words), offsets
+
+
+class TranscriptIndex:
+    """Normalized transcript with an offset map and a word n-gram index"""
+
+    def __init__(self, text: str, n: int = NGRAM_SIZE):
+        self.text = text
+        self.n = n
+        self.normalized, self.offsets = normalize(text)
+        # padded so exact matches can be anchored at word boundaries on both sides
+        self._padded = f' {self.normalized} '
+
+        self.words = self.normalized.split()
+        # word start positions in the normalized text
+        self.word_starts = []
+        position = 0
+        for word in self.words:
+            self.word_starts.append(position)
+            position += len(word) + 1
+        self.ngrams = defaultdict(list)
+        for i in range(len(self.words) - n + 1):
+            self.ngrams[tuple(self.words[i:i + n])].append(i)
+
+    def _span(self, start: int, length: int) -> Tuple[int, int]:
+        """Original (start, end) offsets of a normalized slice"""
+        return self.offsets[start], self.offsets[start + length - 1] + 1
+
+    def _fuzzy(self, words: List[str]) -> Tuple[Optional[int], float]:
+        """Best word position for the quote by n-gram votes, and its similarity"""
+        if len(words) < self.n:
+            return None, 0.0
+        votes = Counter()
+        for j in range(len(words) - self.n + 1):
+            postings = self.ngrams.get(tuple(words[j:j + self.n]), ())
+            if len(postings) <= MAX_POSTINGS:
+                for i in postings:
+                    votes[i - j] += 1
+        if not votes:
+            return None, 0.0
+
+        # word-level similarity: cheap, and one misspelt word costs one word
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(words)
+
+        def score(start: int, count: int) -> float:
+            matcher.set_seq1(self.words[start:start + count])
+            return matcher.ratio()
+
+        # pick the best-voted start, then allow a few words of slack for dropped or inserted words
+        best, best_score = None, -1.0
+        for candidate, _ in votes.most_common(2):
+            candidate_score = score(max(0, candidate), len(words))
+            if candidate_score > best_score:
+                best, best_score = max(0, candidate), candidate_score
+        count = len(words)
+        for slack in (1, -1, 2, -2):
+            if len(words) + slack > 0:
+                slack_score = score(best, len(words) + slack)
+                if slack_score > best_score:
+                    count, best_score = len(words) + slack, slack_score
+        return (best, count), best_score
+
+    def _verify_segment(self, quote: str) -> CitationMatch:
+        words = normalize_words(quote)
+        if not words:
+            return CitationMatch(quote, NOT_FOUND)
+
+        needle = ' '.join(words)
+        # index p in the padded text is the space before the match, i.e. normalized index p
+        position = self._padded.find(f' {needle} ')
+        if position >= 0:
+            return CitationMatch(quote, EXACT, *self._span(position, len(needle)), score=1.0)
+
+        best, score = self._fuzzy(words)
+        if best is None or score < FUZZY_THRESHOLD:
+            return CitationMatch(quote, NOT_FOUND, score=score)
+        first, count = best
+        count = min(count, len(self.words) - first)
+        # a near match must not change a clinical value: every number has to appear as quoted
+        window = set(self.words[first:first + count])
+        if any(word not in window for word in words if any(ch.isdigit() for ch in word)):
+            return CitationMatch(quote, NOT_FOUND, score=score)
+        start = self.word_starts[first]
+        last = first + count - 1
+        length = self.word_starts[last] + len(self.words[last]) - start
+        return CitationMatch(quote, FUZZY, *self._span(start, length), score=score)
+
+    def verify(self, quote: str) -> CitationMatch:
+        """Locate a quote in the transcript; start/end are offsets into the original text"""
+        segments = [segment for segment in ELLIPSIS_PATTERN.split(quote or '') if WORD_PATTERN.search(segment)]
+        if len(segments) <= 1:
+            return self._verify_segment(segments[0] if segments else '')
+
+        matches = [self._verify_segment(segment) for segment in segments]
+        if not all(m.found for m in matches) or any(a.start > b.start for a, b in zip(matches, matches[1:])):
+            return CitationMatch(quote, NOT_FOUND, score=min(m.score for m in matches))
+        status = EXACT if all(m.status == EXACT for m in matches) else FUZZY
+        return CitationMatch(quote, status, matches[0].start, matches[-1].end, min(m.score for m in matches))
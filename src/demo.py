@@ -1,8 +1,8 @@
 import streamlit as st
 import json
 from mono_utils import (
-    load_template, extract_with_citations, 
-    load_transcript, get_field_values, format_field_name
+    load_template, extract_with_citations, extract_with_citations_stream,
+    apply_sparse_fields, load_transcript, get_field_values, format_field_name
 )
 
 # Main UI
@@ -20,13 +20,29 @@ normalized_form_type = "CMS" if form_type == "CMS" else "OASIS"
 sample_transcript = load_transcript(normalized_form_type)
 transcript = st.text_area("Medical Transcript:", value=sample_transcript, height=300)
 
+stream = st.checkbox("Stream fields as they arrive", help="Show each field as soon as the model completes it")
+# streaming is a single request, so it cannot be split by section
+sectioned = st.checkbox("Extract sections in parallel", disabled=stream,
+                        help="Not available while streaming fields" if stream
+                        else "One concurrent request per top-level form section") and not stream
+
 # Process button
 if st.button("Extract Data"):
     template = cms_template if form_type == "CMS" else oasis_template
     
-    with st.spinner("Processing..."):
-        result = extract_with_citations(transcript, template, form_type)
-        filled = result.get("filled_form", {})
+    if stream:
+        placeholder = st.empty()
+        entries = []
+        for path, value, citation in extract_with_citations_stream(transcript, template, form_type):
+            entries.append({"path": path, "value": value, "quote": citation["source_quote"],
+                            "confidence": citation["confidence"]})
+            placeholder.text("\n".join(f"{format_field_name(e['path'])}: {e['value']}" for e in entries))
+        placeholder.empty()
+        filled = apply_sparse_fields(template, entries)["filled_form"]
+    else:
+        with st.spinner("Processing..."):
+            result = extract_with_citations(transcript, template, form_type, sectioned=sectioned)
+            filled = result.get("filled_form", {})
     
     # Compare filled vs empty
     original_fields = get_field_values(template)
@@ -0,0 +1,278 @@
+"""
+Embedding Backends - interchangeable sentence encoders for streaming.py
+
+- "sentence-transformers": the reference PyTorch SentenceTransformer (default)
+- "onnx": the same transformer exported to ONNX and run with onnxruntime
+- "onnx-int8": the ONNX export with dynamically int8-quantized weights
+
+ONNX backends reproduce the SentenceTransformer pipeline (mean pooling over the
+attention mask, then L2 normalisation). Exports are written once to
+ONNX_CACHE_DIR; after that the ONNX backends do not need torch at all. Each
+export is built in a scratch directory and moved into place whole, so pool
+workers racing on a cold cache never see a half-written one.
+
+Usage:
+    python embedding_backends.py [transcript.txt ...] [--backends ...]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import numpy as np
+
+ONNX_CACHE_DIR = os.getenv(
+    'STREAMING_ONNX_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'nlp-nursing', 'onnx')
+)
+ONNX_OPSET = 14
+# torch device for the sentence-transformers backend, e.g. 'cpu' or 'cuda';
+# unset lets sentence-transformers pick CUDA / MPS when available
+DEVICE = os.getenv('STREAMING_DEVICE') or None
+
+
+class EmbeddingBackend(ABC):
+    """A sentence encoder with the SentenceTransformer.encode calling convention"""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed a string (returns a vector) or a list of strings (returns a matrix)"""
+        pass
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Reference fp32 PyTorch encoder, on DEVICE (auto-selected by default)"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str, device: str = None):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=device or DEVICE)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+def export_dir(model_name: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '__'))
+
+
+def export_onnx(model_name: str) -> str:
+    """Export the model's transformer to ONNX (once) and return the model path"""
+    out_dir = export_dir(model_name)
+    path = os.path.join(out_dir, 'model.onnx')
+    if os.path.isdir(out_dir):
+        return path
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model[0].tokenizer
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            if token_type_ids is None:
+                return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids)[0]
+
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=ONNX_CACHE_DIR, prefix='.export-')
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            os.path.join(scratch, 'model.onnx'),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET
+        )
+    tokenizer.save_pretrained(scratch)
+    with open(os.path.join(scratch, 'config.json'), 'w') as f:
+        json.dump({"model_name": model_name, "max_seq_length": st_model.max_seq_length}, f)
+    try:
+        os.replace(scratch, out_dir)
+    except OSError:
+        # another process finished the same export first; keep theirs
+        shutil.rmtree(scratch, ignore_errors=True)
+    return path
+
+
+def quantize_onnx(model_name: str) -> str:
+    """Dynamically quantize the ONNX export's weights to int8 (once)"""
+    path = os.path.join(export_dir(model_name), 'model.int8.onnx')
+    if not os.path.exists(path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        source = export_onnx(model_name)
+        fd, scratch = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.model.int8-', suffix='.onnx')
+        os.close(fd)
+        try:
+            quantize_dynamic(source, scratch, weight_type=QuantType.QInt8)
+            os.replace(scratch, path)
+        finally:
+            if os.path.exists(scratch):
+                os.remove(scratch)
+    return path
+
+
+class OnnxBackend(EmbeddingBackend):
+    """fp32 ONNX export run on onnxruntime's CPU provider"""
+
+    name = "onnx"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = self._model_path()
+        out_dir = export_dir(model_name)
+        with open(os.path.join(out_dir, 'config.json'), 'r') as f:
+            self.max_length = json.load(f)["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(out_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # honour the per-worker thread cap set by batch_segment
+        options.intra_op_num_threads = int(os.getenv('OMP_NUM_THREADS', '0'))
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _model_path(self) -> str:
+        return export_onnx(self.model_name)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors='np')
+            inputs = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, inputs)[0]
+            # mean pooling over real tokens, as in the SentenceTransformer pipeline
+            mask = tokens['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX export with dynamically int8-quantized weights"""
+
+    name = "onnx-int8"
+
+    def _model_path(self) -> str:
+        return quantize_onnx(self.model_name)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SentenceTransformerBackend, OnnxBackend, QuantizedOnnxBackend)
+}
+
+
+def create_backend(name: str, model_name: str) -> EmbeddingBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name)
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def benchmark_backends(texts: List[str], model_name: str, backends: List[str] = None,
+                       batch_size: int = 32, latency_samples: int = 50) -> Dict[str, Dict]:
+    """Latency, throughput and cosine agreement of each backend against the fp32 reference"""
+    backends = backends or list(BACKENDS)
+    reference = None
+    results = {}
+
+    for name in ["sentence-transformers"] + [b for b in backends if b != "sentence-transformers"]:
+        backend = create_backend(name, model_name)
+        backend.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+
+        latencies = []
+        for text in texts[:latency_samples]:
+            start = time.perf_counter()
+            backend.encode(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        embeddings = backend.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        if reference is None:
+            reference = normalized
+        cosines = np.sum(normalized * reference, axis=1)
+
+        results[name] = {
+            "latency_ms_p50": round(statistics.median(latencies), 2),
+            "latency_ms_p95": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 2),
+            "texts_per_second": round(len(texts) / elapsed, 1),
+            "cosine_mean": round(float(cosines.mean()), 5),
+            "cosine_min": round(float(cosines.min()), 5)
+        }
+    return results
+
+
+def main():
+    import streaming
+
+    parser = argparse.ArgumentParser(description="Compare embedding backends on sample transcripts")
+    parser.add_argument("transcripts", nargs="*", help="transcript files (default: outputs/sample_scripts/*.txt)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--model", default=streaming.MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    paths = args.transcripts
+    if not paths:
+        sample_dir = os.path.join(os.path.dirname(__file__), '..', 'outputs', 'sample_scripts')
+        if os.path.isdir(sample_dir):
+            paths = [os.path.join(sample_dir, name) for name in sorted(os.listdir(sample_dir)) if name.endswith('.txt')]
+
+    texts = []
+    for path in paths:
+        texts.extend(interaction.text for interaction in streaming.iter_transcript_file(path))
+    if not texts:
+        from benchmark_segmentation import generate_transcript
+        texts = streaming.parse_interactions(generate_transcript(1000)[0])
+
+    results = benchmark_backends(texts, streaming.MODEL_ALIASES.get(args.model, args.model),
+                                 args.backends, args.batch_size)
+    print(f"{len(texts)} texts")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
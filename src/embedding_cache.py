@@ -0,0 +1,162 @@
+"""
+Embedding Cache - two-tier cache for sentence embeddings
+
+Embeddings are keyed by (model name, sha1 of text). Recent entries live in an
+in-memory LRU; everything is also written through to a size-bounded SQLite
+file so boilerplate prompts are only ever embedded once per model.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from sqlite_store import SQLiteStore
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS embeddings (
+        model TEXT NOT NULL,
+        key TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (model, key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)"
+)
+
+
+class EmbeddingCache:
+    """In-memory LRU in front of an optional SQLite store."""
+
+    def __init__(self, model_name: str, path: Optional[str] = None,
+                 max_memory_items: int = 10000, max_disk_items: int = 1000000):
+        self.model_name = model_name
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = SQLiteStore(path, "embeddings", SCHEMA, max_disk_items) if path is not None else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # -------------------------------------------------------------------------
+    # SQLite tier
+    # -------------------------------------------------------------------------
+
+    def _db(self):
+        """Open the on-disk store on first use"""
+        return self._store.connect() if self._store is not None else None
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        conn = self._db()
+        if conn is None or not keys:
+            return {}
+        found = {}
+        # stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [self.model_name, *chunk]
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                [(now, self.model_name, key) for key in found]
+            )
+            conn.commit()
+        return found
+
+    def _disk_put(self, items: Dict[str, np.ndarray]):
+        conn = self._db()
+        if conn is None or not items:
+            return
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.model_name, key, np.asarray(vec, dtype=np.float32).tobytes(), now)
+             for key, vec in items.items()]
+        )
+        self._store.added(len(items))
+        conn.commit()
+
+    # -------------------------------------------------------------------------
+    # Memory tier
+    # -------------------------------------------------------------------------
+
+    def _memory_put(self, key: str, vec: np.ndarray):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return an (n, d) embedding matrix, calling encode_fn once on the misses"""
+        keys = [self.key(text) for text in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+                    self.memory_hits += 1
+
+            pending = [key for key in dict.fromkeys(keys) if key not in vectors]
+            for key, vec in self._disk_get(pending).items():
+                vectors[key] = vec
+                self._memory_put(key, vec)
+                self.disk_hits += 1
+
+        # encode each distinct missing text once, outside the lock
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            encoded = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            new_items = dict(zip(missing.keys(), encoded))
+            with self._lock:
+                self.misses += len(new_items)
+                for key, vec in new_items.items():
+                    self._memory_put(key, vec)
+                self._disk_put(new_items)
+            vectors.update(new_items)
+
+        return np.stack([vectors[key] for key in keys])
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for both tiers"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_evictions": self._store.evictions if self._store is not None else 0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
@@ -4,6 +4,7 @@ from mono_utils import (
     load_template, extract_with_citations, 
     load_transcript, get_field_values, format_field_name
 )
+from citation_index import TranscriptIndex
 
 # Main UI
 st.title("Medical Form Demo with Evaluation")
@@ -20,10 +21,22 @@ normalized_form_type = "CMS" if form_type == "CMS" else "OASIS"
 sample_transcript = load_transcript(normalized_form_type)
 transcript = st.text_area("Medical Transcript:", value=sample_transcript, height=300)
 
-def evaluate_citations(citation_data):
-    """Simple evaluation function"""
+def citation_issues(confidence, match):
+    if match is not None and not match.found:
+        return "Quote not found in transcript"
+    if confidence < 6:
+        return "Low confidence"
+    return "none"
+
+def evaluate_citations(citation_data, transcript=None):
+    """Simple evaluation function; quotes are checked against the transcript when one is given"""
     filled_form = citation_data.get("filled_form", {})
     citations = citation_data.get("citations", {})
+    matches = {}
+    if transcript:
+        index = TranscriptIndex(transcript)
+        matches = {path: index.verify(str(c.get("source_quote") or "")) for path, c in citations.items()}
+    verified = sum(1 for match in matches.values() if match.found) if transcript else None
     
     field_values = get_field_values(filled_form)
     total_fields = len(field_values)
@@ -40,25 +53,32 @@ def evaluate_citations(citation_data):
             "coverage_percentage": round(coverage_percentage, 1),
             "empty_fields": total_fields - filled_fields,
             "overall_quality": round(avg_confidence),
-            "average_confidence": round(avg_confidence, 1)
+            "average_confidence": round(avg_confidence, 1),
+            "verified_citations": verified,
+            "unverified_citations": len(citations) - verified if transcript else None
         },
         "field_analysis": {
             field_path: {
                 "confidence": citation_info.get("confidence", 0),
                 "source_quote": citation_info.get("source_quote", "No citation"),
-                "issues": "Low confidence" if citation_info.get("confidence", 0) < 6 else "none"
+                "quote_status": matches[field_path].status if field_path in matches else "unchecked",
+                "quote_span": ([matches[field_path].start, matches[field_path].end]
+                               if field_path in matches and matches[field_path].found else None),
+                "issues": citation_issues(citation_info.get("confidence", 0), matches.get(field_path))
             } for field_path, citation_info in citations.items()
         }
     }
 
+sectioned = st.checkbox("Extract sections in parallel", help="One concurrent request per top-level form section")
+
 # Process button
 if st.button("Extract Data & Evaluate"):
     template = cms_template if form_type == "CMS" else oasis_template
     
     with st.spinner("Processing..."):
-        citation_data = extract_with_citations(transcript, template, form_type)
+        citation_data = extract_with_citations(transcript, template, form_type, sectioned=sectioned)
         filled = citation_data.get("filled_form", {})
-        evaluation = evaluate_citations(citation_data)
+        evaluation = evaluate_citations(citation_data, transcript)
     
     # Display metrics at the top
     st.success("Processing Complete")
@@ -90,6 +110,9 @@ if st.button("Extract Data & Evaluate"):
         avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
         
         st.metric("Average Confidence", f"{avg_confidence:.1f}/10")
+        if metrics['verified_citations'] is not None:
+            st.metric("Quotes Not In Transcript", metrics['unverified_citations'],
+                      f"{metrics['verified_citations']} verified", delta_color="off")
         
         # Detailed field breakdown
         for field_path, analysis in field_analysis.items():
@@ -112,6 +135,8 @@ if st.button("Extract Data & Evaluate"):
                 with col_b:
                     st.write("**Source Citation:**")
                     st.info(f'"{analysis.get("source_quote", "No citation provided")}"')
+                    if analysis.get("quote_status") == "fuzzy":
+                        st.caption("Approximate match in transcript")
                     
                     issues = analysis.get("issues", "none")
                     if issues != "none":
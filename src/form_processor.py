@@ -1,17 +1,18 @@
 import sys
 import os
-from mono_utils import process_pdf_form
+import json
+from mono_utils import process_pdf_form_with_source
 
 def process_form(pdf_path, output_path, form_name="Medical Form"):
     """Process medical form PDF and save as JSON"""
     try:
         print(f"Extracting {form_name} Data...")
-        result = process_pdf_form(pdf_path)
+        result, source = process_pdf_form_with_source(pdf_path)
         
         with open(output_path, "w") as f:
-            f.write(result if isinstance(result, str) else str(result))
+            json.dump(result, f, indent=2)
         
-        print(f"✓ {form_name} data extracted to: {output_path}")
+        print(f"✓ {form_name} data extracted to: {output_path} (via {source})")
         return True
     except Exception as e:
         print(f"Error processing {form_name}: {e}")
@@ -2,16 +2,17 @@
 Mono Utils - Minimal consolidated utilities for NLP Nursing project
 """
 
+import asyncio
+import copy
 import json
 import os
-from typing import Dict, List, Any
-from dotenv import load_dotenv
-from google import genai
-from google.genai.types import HttpOptions, Part
-import vertexai
-import langextract as lx
+import re
+import sys
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-load_dotenv()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from resilience import Resilience
 
 # =============================================================================
 # CONFIG
@@ -20,16 +21,104 @@ load_dotenv()
 PROJECT_ID = "suki-dev"
 LOCATION = "us-central1"
 GEMINI_MODEL = "gemini-2.5-flash"
-LANGEXTRACT_API_KEY = os.getenv('LANGEXTRACT_API_KEY')
+# in-flight requests for the async batch helpers
+DEFAULT_CONCURRENCY = 32
 
-# Initialize Vertex AI
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-client = genai.Client(
-    vertexai=True,
-    project=PROJECT_ID,
-    location=LOCATION,
-    http_options=HttpOptions(api_version="v1")
-)
+# Settings below are read from the environment (or .env) on first use, not at
+# import, since .env is only loaded then; see get_client / get_resilience.
+# retries / deadline / rate limit for every Gemini call: MAX_RETRIES,
+# GEMINI_TIMEOUT_SECONDS (whole call, retries included; also bounds each HTTP
+# attempt) and MODEL_RATE_LIMIT (requests/second, unset = unlimited)
+DEFAULT_MODEL_MAX_RETRIES = 3
+DEFAULT_MODEL_TIMEOUT_SECONDS = 120
+
+# LLM response cache, OFF unless NLP_NURSING_RESPONSE_CACHE names its SQLite
+# file. Cached responses are model output extracted from visit transcripts,
+# i.e. patient data, stored unencrypted for RESPONSE_CACHE_TTL: only enable it
+# on storage approved for PHI.
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_ENTRIES = 10000
+# output budget for each request in sectioned extraction
+SECTION_MAX_OUTPUT_TOKENS = 8192
+# "full" echoes the whole filled template; "sparse" returns only the filled fields
+OUTPUT_MODES = ("full", "sparse")
+
+# The Vertex AI client and the heavy SDK imports are created on first use, so
+# importing the pure helpers below costs nothing and needs no GCP credentials.
+_client = None
+_client_lock = threading.Lock()
+_env_loaded = False
+_response_cache = None
+_resilience = None
+_loop = None
+
+# truncation / salvage counters for extract_with_citations, see get_extraction_stats
+_extraction_stats = dict.fromkeys(
+    ("responses", "malformed", "fields_salvaged", "fields_lost", "sections_retried", "sections_recovered"), 0)
+_stats_lock = threading.Lock()
+
+def _load_env():
+    """Load .env once per process"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def get_client():
+    """Process-wide Vertex AI client, created on first use (thread-safe)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _load_env()
+                import vertexai
+                from google import genai
+                from google.genai.types import HttpOptions
+
+                vertexai.init(project=PROJECT_ID, location=LOCATION)
+                _client = genai.Client(
+                    vertexai=True,
+                    project=PROJECT_ID,
+                    location=LOCATION,
+                    # bounds a single attempt; the retry deadline bounds the whole call
+                    http_options=HttpOptions(api_version="v1", timeout=int(_model_timeout() * 1000))
+                )
+    return _client
+
+def _model_timeout() -> float:
+    _load_env()
+    return float(os.getenv("GEMINI_TIMEOUT_SECONDS", DEFAULT_MODEL_TIMEOUT_SECONDS))
+
+def get_resilience() -> Resilience:
+    """Process-wide retry / rate-limit / circuit-breaker policy for Vertex AI calls"""
+    global _resilience
+    if _resilience is None:
+        with _client_lock:
+            if _resilience is None:
+                _load_env()
+                _resilience = Resilience(int(os.getenv("MAX_RETRIES", DEFAULT_MODEL_MAX_RETRIES)), _model_timeout(),
+                                         rate_per_second=float(os.getenv("MODEL_RATE_LIMIT", "0")) or None)
+    return _resilience
+
+def get_response_cache():
+    """Process-wide LLM response cache, or None unless NLP_NURSING_RESPONSE_CACHE is set"""
+    global _response_cache
+    if _response_cache is None:
+        _load_env()
+        path = os.getenv('NLP_NURSING_RESPONSE_CACHE')
+        if not path:
+            return None
+        with _client_lock:
+            if _response_cache is None:
+                from response_cache import ResponseCache
+                _response_cache = ResponseCache(path, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL)
+    return _response_cache
+
+def get_cache_stats() -> Dict[str, float]:
+    """Hit-rate stats of the LLM response cache"""
+    cache = get_response_cache()
+    return cache.stats() if cache else {}
 
 # =============================================================================
 # FILE I/O
@@ -80,14 +169,169 @@ def clean_ai_response(text: str) -> str:
         text = text.split('\n', 1)[1].rsplit('\n', 1)[0]
     return text
 
-def generate_with_ai(prompt: str, pdf_data: bytes = None) -> str:
-    """Generate content with Vertex AI"""
+def _build_contents(prompt: str, pdf_data: bytes = None) -> List:
+    from google.genai.types import Part
+
     contents = [prompt]
     if pdf_data:
         contents.append(Part.from_bytes(data=pdf_data, mime_type="application/pdf"))
-    
-    response = client.models.generate_content(model=GEMINI_MODEL, contents=contents)
-    return clean_ai_response(response.text)
+    return contents
+
+def _cached(prompt: str, pdf_data: bytes, config: Dict, use_cache: bool, store: bool = True):
+    """Return (cache to store into or None, key, cached response) for a request.
+
+    use_cache=False skips the lookup, store=False skips writing the response"""
+    cache = get_response_cache()
+    if cache is None or not (use_cache or store):
+        return None, None, None
+    key = cache.key(GEMINI_MODEL, prompt, pdf_data, config)
+    return cache if store else None, key, cache.get(key) if use_cache else None
+
+def _store(cache, key: str, text: str, validate: Callable[[str], bool] = None):
+    """Cache a fresh response, unless it is empty or the caller's validate rejects it"""
+    if cache is not None and text and (validate is None or validate(text)):
+        cache.put(key, text)
+
+def is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+def generate_with_ai(prompt: str, pdf_data: bytes = None, config: Dict = None,
+                     use_cache: bool = True, validate: Callable[[str], bool] = None,
+                     store: bool = True) -> str:
+    """Generate content with Vertex AI; identical requests are served from the response cache
+    (when enabled, see get_response_cache).
+
+    use_cache=False forces a fresh call (whose result is still cached unless
+    store=False); a response is only cached if validate(text) accepts it, e.g. is_json."""
+    cache, key, cached = _cached(prompt, pdf_data, config, use_cache, store)
+    if cached is not None:
+        return cached
+
+    contents = _build_contents(prompt, pdf_data)
+    response = get_resilience().call(get_client().models.generate_content,
+                                     model=GEMINI_MODEL, contents=contents, config=config)
+    text = clean_ai_response(response.text or "")
+    _store(cache, key, text, validate)
+    return text
+
+async def generate_with_ai_async(prompt: str, pdf_data: bytes = None, config: Dict = None,
+                                 use_cache: bool = True, validate: Callable[[str], bool] = None,
+                                 store: bool = True) -> str:
+    """Generate content with Vertex AI without blocking a thread"""
+    cache, key, cached = _cached(prompt, pdf_data, config, use_cache, store)
+    if cached is not None:
+        return cached
+
+    contents = _build_contents(prompt, pdf_data)
+    response = await get_resilience().acall(get_client().aio.models.generate_content,
+                                            model=GEMINI_MODEL, contents=contents, config=config)
+    text = clean_ai_response(response.text or "")
+    _store(cache, key, text, validate)
+    return text
+
+def _open_stream(**kwargs) -> Tuple[Any, Iterator]:
+    """Start a streamed generation and wait for its first chunk; returns (first chunk or None, rest)"""
+    stream = iter(get_client().models.generate_content_stream(**kwargs))
+    return next(stream, None), stream
+
+def generate_with_ai_stream(prompt: str, pdf_data: bytes = None, config: Dict = None,
+                            use_cache: bool = True, validate: Callable[[str], bool] = None,
+                            store: bool = True) -> Iterator[str]:
+    """Yield the response text chunk by chunk as the model produces it.
+
+    Chunks are raw (code fences are not stripped). A cached response is
+    yielded as a single chunk; a fully consumed stream is cached."""
+    cache, key, cached = _cached(prompt, pdf_data, config, use_cache, store)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    contents = _build_contents(prompt, pdf_data)
+    # the request is only sent once the stream is iterated, so the policy covers
+    # everything up to the first chunk; a stream that breaks later is not replayed
+    first, stream = get_resilience().call(_open_stream, model=GEMINI_MODEL, contents=contents, config=config)
+    for chunk in ([first] if first is not None else []):
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield chunk.text
+    for chunk in stream:
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield chunk.text
+
+    text = clean_ai_response("".join(chunks))
+    _store(cache, key, text, validate)
+
+# A batch request is a prompt or a (prompt, pdf_data) pair
+AIRequest = Union[str, Tuple[str, bytes]]
+
+def _unpack_request(request: AIRequest) -> Tuple[str, bytes]:
+    return (request, None) if isinstance(request, str) else request
+
+async def _bounded_generate(semaphore: asyncio.Semaphore, request: AIRequest, use_cache: bool = True,
+                            config: Dict = None, validate: Callable[[str], bool] = None,
+                            store: bool = True) -> str:
+    async with semaphore:
+        return await generate_with_ai_async(*_unpack_request(request), config=config, use_cache=use_cache,
+                                            validate=validate, store=store)
+
+async def generate_batch_async(requests: Sequence[AIRequest], concurrency: int = DEFAULT_CONCURRENCY,
+                               return_exceptions: bool = False, use_cache: bool = True,
+                               config: Dict = None, validate: Callable[[str], bool] = None,
+                               store: bool = True) -> List[Union[str, Exception]]:
+    """Run many requests with at most `concurrency` in flight; results in request order"""
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *(_bounded_generate(semaphore, request, use_cache, config, validate, store) for request in requests),
+        return_exceptions=return_exceptions
+    )
+
+async def generate_as_completed(requests: Sequence[AIRequest],
+                                concurrency: int = DEFAULT_CONCURRENCY) -> AsyncIterator[Tuple[int, Union[str, Exception]]]:
+    """Yield (request index, result or exception) as each request finishes"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def indexed(index: int, request: AIRequest):
+        try:
+            return index, await _bounded_generate(semaphore, request)
+        except Exception as e:
+            return index, e
+
+    tasks = [asyncio.ensure_future(indexed(i, request)) for i, request in enumerate(requests)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop on a daemon thread for the blocking async wrappers.
+
+    The aio client keeps its pooled connections bound to the loop that first
+    used them, so every blocking call must run on this same loop rather than on
+    a fresh asyncio.run loop that is closed afterwards."""
+    global _loop
+    if _loop is None:
+        with _client_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="mono-utils-aio", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def generate_batch(requests: Sequence[AIRequest], concurrency: int = DEFAULT_CONCURRENCY,
+                   return_exceptions: bool = False, use_cache: bool = True,
+                   config: Dict = None, validate: Callable[[str], bool] = None,
+                   store: bool = True) -> List[Union[str, Exception]]:
+    """Blocking wrapper around generate_batch_async, usable from any thread (loop or not)"""
+    coroutine = generate_batch_async(requests, concurrency, return_exceptions, use_cache, config, validate, store)
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop()).result()
 
 # =============================================================================
 # LANGEXTRACT
@@ -95,6 +339,8 @@ def generate_with_ai(prompt: str, pdf_data: bytes = None) -> str:
 
 def extract_medical_entities(text: str) -> List[Dict[str, Any]]:
     """Extract medical entities using LangExtract"""
+    import langextract as lx
+    _load_env()
     
     prompt = """Extract medical information including patient names, medications, dosages, 
     conditions, dates, vital signs, addresses, phone numbers, and insurance information."""
@@ -117,7 +363,7 @@ def extract_medical_entities(text: str) -> List[Dict[str, Any]]:
         prompt_description=prompt,
         examples=examples,
         model_id="gemini-2.5-pro",
-        api_key=LANGEXTRACT_API_KEY,
+        api_key=os.getenv('LANGEXTRACT_API_KEY'),
         max_workers=8
     )
     
@@ -138,9 +384,8 @@ def extract_medical_entities(text: str) -> List[Dict[str, Any]]:
 # FORM PROCESSING
 # =============================================================================
 
-def extract_with_citations(transcript: str, template: Dict, form_type: str) -> Dict:
-    """Extract data into form template with citations"""
-    prompt = f"""Fill this {form_type} form using ONLY information from the transcript.
+def _citation_prompt(transcript: str, template: Dict, form_type: str) -> str:
+    return f"""Fill this {form_type} form using ONLY information from the transcript.
 
 TEMPLATE: {json.dumps(template, indent=2)}
 
@@ -162,24 +407,527 @@ Return JSON:
         }}
     }}
 }}"""
-    
-    response = generate_with_ai(prompt)
+
+def _sparse_prompt(transcript: str, template: Dict, form_type: str) -> str:
+    return f"""Fill this {form_type} form using ONLY information from the transcript.
+
+TEMPLATE: {json.dumps(template, separators=(',', ':'))}
+
+TRANSCRIPT: {transcript}
+
+Rules:
+- Only use information explicitly mentioned
+- Return ONLY fields you can fill; omit everything not mentioned
+- "path" is the dot-separated key path of a leaf field in the template
+- List entries in template order
+- Provide exact quotes as citations
+
+Return JSON:
+{{
+    "fields": [
+        {{"path": "section.field", "value": "extracted value", "quote": "exact quote", "confidence": 8}}
+    ]
+}}"""
+
+def apply_sparse_fields(template: Dict, fields: Sequence[Dict]) -> Dict:
+    """Merge sparse {path, value, quote, confidence} entries into a copy of the template.
+
+    Entries whose path is not a leaf of the template, or whose value is empty,
+    are dropped. Returns the extract_with_citations shape."""
+    paths = get_field_paths(template)
+    filled = copy.deepcopy(template)
+    citations = {}
+    for entry in fields:
+        citation = _sparse_citation(entry, paths)
+        if citation is None:
+            continue
+        path = entry["path"]
+        *parents, leaf = paths[path]
+        target = filled
+        for key in parents:
+            target = target[key]
+        target[leaf] = citation["value"]
+        citations[path] = citation
+    return {"filled_form": filled, "citations": citations}
+
+def _sparse_citation(entry: Any, paths: Dict[str, Tuple]) -> Optional[Dict]:
+    """Citation for a sparse entry, or None if its path is unknown or its value empty"""
+    if not isinstance(entry, dict):
+        return None
+    path, value = entry.get("path"), entry.get("value")
+    # the model may emit any JSON here; only a string can name a field
+    if not isinstance(path, str) or path not in paths or value is None or not str(value).strip():
+        return None
+    return {
+        "value": value,
+        "source_quote": entry.get("quote", ""),
+        "confidence": entry.get("confidence", 0)
+    }
+
+def _extraction_prompt(transcript: str, template: Dict, form_type: str, output_mode: str) -> str:
+    if output_mode == "sparse":
+        return _sparse_prompt(transcript, template, form_type)
+    return _citation_prompt(transcript, template, form_type)
+
+def _parse_extraction(response: str, template: Dict, output_mode: str) -> Dict:
+    """Parse a model response into {"filled_form", "citations"}; raises on bad JSON"""
+    data = json.loads(response)
+    if output_mode == "sparse":
+        fields = data.get("fields", []) if isinstance(data, dict) else data
+        return apply_sparse_fields(template, fields)
+    return data
+
+def _record_extraction(**counts):
+    with _stats_lock:
+        for name, count in counts.items():
+            _extraction_stats[name] += count
+
+def get_extraction_stats() -> Dict[str, float]:
+    """Counts of malformed/truncated responses and of fields salvaged from or lost with them"""
+    with _stats_lock:
+        stats = dict(_extraction_stats)
+    stats["malformed_rate"] = stats["malformed"] / stats["responses"] if stats["responses"] else 0.0
+    return stats
+
+def salvage_extraction(response: str, template: Dict, output_mode: str = "full") -> Tuple[Dict, List[str]]:
+    """Recover every complete field and citation from a truncated or malformed response.
+
+    Returns (result in the extract_with_citations shape, top-level sections the
+    response did not finish). Only fields at template leaf paths are kept."""
+    from tolerant_json import parse_partial
+
+    root, events, complete = parse_partial(response)
+    sections = list(template)
+    paths = get_field_paths(template)
+    closed = {path for path, _ in events}
+
+    if output_mode == "sparse":
+        # entries are ("fields", i) in {"fields": [...]}, or (i,) in a bare list
+        fields = [value for path, value in events if isinstance(value, dict) and (
+            (len(path) == 2 and path[0] == "fields") or (len(path) == 1 and isinstance(path[0], int)))]
+        result = apply_sparse_fields(template, fields)
+        salvaged = set(result["citations"])
+        if ("fields",) in closed or (complete and isinstance(root, list)):
+            missing = []
+        else:
+            # entries should come in template order, but nothing enforces it: any
+            # section without a complete entry may have been cut off, and so may
+            # the section of the last complete entry
+            seen = {paths[path][0] for path in salvaged}
+            last = next((paths[entry["path"]][0] for entry in reversed(fields)
+                         if isinstance(entry.get("path"), str) and entry["path"] in result["citations"]), None)
+            missing = [section for section in sections if section not in seen or section == last]
+    else:
+        keys_to_path = {keys: path for path, keys in paths.items()}
+        filled = copy.deepcopy(template)
+        salvaged = set()
+        for path, value in events:
+            if path[:1] == ("filled_form",) and path[1:] in keys_to_path:
+                *parents, leaf = path[1:]
+                target = filled
+                for key in parents:
+                    target = target[key]
+                target[leaf] = value
+                salvaged.add(keys_to_path[path[1:]])
+        citations = {path[1]: value for path, value in events
+                     if len(path) == 2 and path[0] == "citations" and isinstance(value, dict)}
+        result = {"filled_form": filled, "citations": citations}
+        missing = [section for section in sections if ("filled_form", section) not in closed]
+
+    lost = sum(1 for path, keys in paths.items() if keys[0] in missing and path not in salvaged)
+    _record_extraction(malformed=1, fields_salvaged=len(salvaged), fields_lost=lost)
+    return result, missing
+
+def _parse_or_salvage(response: str, template: Dict, output_mode: str) -> Tuple[Dict, List[str]]:
+    _record_extraction(responses=1)
     try:
-        return json.loads(response)
-    except:
-        return {"filled_form": {}, "citations": {}}
+        return _parse_extraction(response, template, output_mode), []
+    except Exception:
+        return salvage_extraction(response, template, output_mode)
+
+def _extract_sections(section_transcripts: Dict[str, str], template: Dict, form_type: str,
+                      concurrency: int, output_mode: str) -> Tuple[Dict, List[str]]:
+    """extract_sections, also returning the sections whose response failed or was cut short"""
+    sections = list(section_transcripts)
+    prompts = [_extraction_prompt(section_transcripts[section], {section: template[section]}, form_type, output_mode)
+               for section in sections]
+    responses = generate_batch(prompts, concurrency, return_exceptions=True, validate=is_json,
+                               config={"max_output_tokens": SECTION_MAX_OUTPUT_TOKENS})
+
+    result = {"filled_form": copy.deepcopy(template), "citations": {}}
+    incomplete = []
+    for section, response in zip(sections, responses):
+        if isinstance(response, Exception):
+            incomplete.append(section)
+            continue
+        partial, missing = _parse_or_salvage(response, {section: template[section]}, output_mode)
+        incomplete.extend(missing)
+        filled = partial.get("filled_form", {})
+        if section in filled:
+            result["filled_form"][section] = filled[section]
+        result["citations"].update(partial.get("citations", {}))
+    return result, incomplete
+
+def extract_sections(section_transcripts: Dict[str, str], template: Dict, form_type: str,
+                     concurrency: int = DEFAULT_CONCURRENCY, output_mode: str = "full") -> Dict:
+    """Fill each top-level template section from its own transcript text, concurrently.
+
+    One request per section, each capped at SECTION_MAX_OUTPUT_TOKENS. Results
+    are merged into the extract_with_citations shape; complete fields are
+    salvaged from a section whose response is cut short or malformed, and a
+    section whose request fails is left as in the template."""
+    return _extract_sections(section_transcripts, template, form_type, concurrency, output_mode)[0]
+
+def extract_with_citations(transcript: str, template: Dict, form_type: str, sectioned: bool = False,
+                           output_mode: str = "full") -> Dict:
+    """Extract data into form template with citations.
+
+    sectioned=True sends each top-level section as its own concurrent request
+    with a bounded output instead of one completion for the whole form.
+    output_mode="sparse" has the model return only the fields it filled, as
+    path/value/quote entries, which are merged into the template locally."""
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output_mode '{output_mode}', expected one of {OUTPUT_MODES}")
+    if sectioned and isinstance(template, dict) and len(template) > 1:
+        return extract_sections({section: transcript for section in template}, template, form_type,
+                                output_mode=output_mode)
+
+    response = generate_with_ai(_extraction_prompt(transcript, template, form_type, output_mode), validate=is_json)
+    if not isinstance(template, dict):
+        try:
+            return _parse_extraction(response, template, output_mode)
+        except:
+            return {"filled_form": {}, "citations": {}}
+
+    result, missing = _parse_or_salvage(response, template, output_mode)
+    if missing:
+        # re-request only the unfinished sections (broken responses are never cached)
+        retry, incomplete = _extract_sections({section: transcript for section in missing}, template, form_type,
+                                              DEFAULT_CONCURRENCY, output_mode)
+        paths = get_field_paths(template)
+        for section in missing:
+            if section not in incomplete or get_field_values(retry["filled_form"][section]):
+                result["filled_form"][section] = retry["filled_form"][section]
+                # salvaged citations go with the salvaged values they replace
+                result["citations"] = {path: citation for path, citation in result["citations"].items()
+                                       if paths.get(path, (None,))[0] != section}
+        result["citations"].update(retry["citations"])
+        _record_extraction(sections_retried=len(missing),
+                           sections_recovered=len([s for s in missing if s not in incomplete]))
+    return result
+
+FieldEvent = Tuple[str, Any, Optional[Dict]]
+
+def extract_with_citations_stream(transcript: str, template: Dict, form_type: str,
+                                  output_mode: str = "sparse") -> Iterator[FieldEvent]:
+    """Stream (field path, value, citation) events as soon as each field is complete.
+
+    In sparse mode each event carries its citation. In full mode filled_form
+    comes before citations, so a field is yielded first with citation None and
+    again when its citation arrives. Only non-empty fields at template leaf
+    paths are yielded."""
+    from tolerant_json import IncrementalJSONParser
+
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output_mode '{output_mode}', expected one of {OUTPUT_MODES}")
+    paths = get_field_paths(template)
+    keys_to_path = {keys: path for path, keys in paths.items()}
+    parser = IncrementalJSONParser()
+
+    prompt = _extraction_prompt(transcript, template, form_type, output_mode)
+    for chunk in generate_with_ai_stream(prompt, validate=is_json):
+        for path, value in parser.feed(chunk):
+            if output_mode == "sparse":
+                if (len(path) == 2 and path[0] == "fields") or (len(path) == 1 and isinstance(path[0], int)):
+                    citation = _sparse_citation(value, paths)
+                    if citation is not None:
+                        yield value["path"], citation["value"], citation
+            elif path[:1] == ("filled_form",) and path[1:] in keys_to_path:
+                if value is not None and str(value).strip():
+                    yield keys_to_path[path[1:]], value, None
+            elif len(path) == 2 and path[0] == "citations" and path[1] in paths and isinstance(value, dict):
+                yield path[1], value.get("value"), value
+
+    _record_extraction(responses=1, malformed=0 if parser.complete else 1)
+
+def extract_with_routing(transcript: str, template: Dict, form_type: str, top_k: int = 3,
+                         output_mode: str = "full") -> Dict:
+    """Extract section by section, sending each template section only the dialogues routed to it"""
+    # imported here so callers that never route don't load the sentence encoder
+    from streaming import plan_routed_extraction
+
+    plan = plan_routed_extraction(transcript, template, top_k)
+    if not plan:
+        return extract_with_citations(transcript, template, form_type, output_mode=output_mode)
+    return extract_sections(plan, template, form_type, output_mode=output_mode)
+
+PDF_FORM_PROMPT = """Extract form structure as JSON with field names, types, and current values."""
+# pages per request in parallel mode
+PDF_PAGES_PER_CHUNK = 2
+
+# widget names that say nothing about the field (e.g. "Text1", "Check Box 3")
+GENERIC_FIELD_NAME = re.compile(r'^(text|field|check ?box|button|radio|textfield)\s*\d*$', re.I)
+# widget names that are an answer to a printed question (e.g. "Yes", "No",
+# "Month (Answers)"): the question has to be part of the key
+ANSWER_FIELD_NAME = re.compile(r'^(yes|no|y|n|n/?a|does not apply|true|false|other)$|\(answers?\)', re.I)
+# words of a printed question kept in a key
+QUESTION_WORDS = 8
+
+def _field_key(label: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_') or "field"
+
+def _has_words(text: str) -> bool:
+    return bool(re.search(r'[A-Za-z]{2,}', text or ''))
+
+def _comb_group(name: str) -> str:
+    """Widget name without its box index: "Telephone Number.8.1.0" -> "Telephone Number.1.0" """
+    return re.sub(r'\.\d+', '', name, count=1)
+
+def _descriptive_name(name: str) -> str:
+    """The widget name as a label, or "" for machine names like "f1_01[0]" or "Text3" """
+    base = re.sub(r'(\.\d+)+$', '', name or '').split('.')[-1]
+    base = re.sub(r'\[\d+\]', '', base).strip()
+    return base if _has_words(base) and not GENERIC_FIELD_NAME.match(base) else ""
+
+def _printed_text(rect, words, max_gap: float = 12) -> str:
+    """Printed label for a widget: the run of words just left of it, else the line just above"""
+    left_words = sorted((w for w in words if w[2] <= rect.x0 + 1 and w[1] < rect.y1 and w[3] > rect.y0),
+                        key=lambda w: -w[2])
+    picked, edge = [], rect.x0
+    for word in left_words:
+        if edge - word[2] > max_gap:
+            break
+        picked.insert(0, word[4])
+        edge = word[0]
+    if not _has_words(' '.join(picked)):
+        picked = [w[4] for w in sorted(words, key=lambda w: w[0])
+                  if 0 <= rect.y0 - w[3] < 14 and w[0] < rect.x1 and w[2] > rect.x0]
+    label = ' '.join(picked).strip().rstrip(':').strip()
+    return label if _has_words(label) else ""
+
+def _row_text(rect, words) -> str:
+    """Printed question on the widget's row to its right, e.g. "1. Is the device ..." beside
+    a Y/N checkbox; answer letters (Y, N, D) in between are skipped"""
+    right = sorted((w for w in words if w[0] >= rect.x1 - 1 and w[1] < rect.y1 and w[3] > rect.y0),
+                   key=lambda w: w[0])
+    start = next((w for w in right if _has_words(w[4]) or re.match(r'^\d+[.)]$', w[4])), None)
+    if start is None:
+        return ""
+    line = [w for w in right if w[0] >= start[0] and abs(w[1] - start[1]) < 2]
+    return ' '.join(w[4] for w in line[:QUESTION_WORDS])
+
+def _column_header(rect, words) -> str:
+    """Nearest line of words above the widget in its column, e.g. the header of a table of rows"""
+    above = [w for w in words if w[3] <= rect.y0 + 1 and w[0] < rect.x1 and w[2] > rect.x0 and _has_words(w[4])]
+    if not above:
+        return ""
+    bottom = max(w[3] for w in above)
+    return ' '.join(w[4] for w in sorted(above, key=lambda w: w[0]) if bottom - w[3] < 3)
+
+def _widget_label(widget, words) -> str:
+    """Best label for a widget: its name when descriptive (the tooltip when that only
+    elaborates the name, e.g. "Weight in pounds" for "Weight"), else the tooltip,
+    the printed text beside it or the header of its column. Answer widgets
+    ("Yes", "No", ...) are labelled with the question they answer plus the answer."""
+    tooltip = (widget.field_label or '').strip()
+    name = _descriptive_name(widget.field_name)
+    if ANSWER_FIELD_NAME.search(name):
+        answer = re.sub(r'\(answers?\)', '', name, flags=re.I).strip()
+        question = _row_text(widget.rect, words) or _printed_text(widget.rect, words) or _column_header(widget.rect, words)
+        return f"{question} {answer}" if question else name
+    if name:
+        if _has_words(tooltip) and _field_key(name) in _field_key(tooltip):
+            return tooltip
+        return name
+    if _has_words(tooltip):
+        return tooltip
+    return (_printed_text(widget.rect, words) or _column_header(widget.rect, words)
+            or widget.field_name or "field")
+
+def extract_form_fields_local(pdf_path: str) -> Dict[str, Any]:
+    """Read a fillable PDF's AcroForm widgets with their metadata.
+
+    Returns {"page_N": {field_key: {"value", "type", "field_names", ["options"]}}},
+    or {} when the PDF has no widgets (non-fillable or scanned). Per-character
+    boxes (e.g. "Telephone Number.0.0" ... ".9.0") are merged into one field;
+    field_names lists the widgets behind each key so values can be written back.
+    """
+    import pymupdf
+
+    fields = {}
+    with pymupdf.open(pdf_path) as doc:
+        for page in doc:
+            widgets = list(page.widgets() or [])
+            if not widgets:
+                continue
+            words = page.get_text("words")
+            section = {}
+            by_name = {}
+            last = None
+
+            for widget in widgets:
+                name = widget.field_name or ""
+                kind = widget.field_type_string.lower()
+                value = widget.field_value
+                if kind in ("checkbox", "radiobutton"):
+                    value = "" if value in (None, "Off", False) else str(value)
+                value = "" if value is None else value
+
+                # radio groups share one field name across their buttons
+                if kind == "radiobutton" and name in by_name:
+                    by_name[name].setdefault("options", []).append(widget.on_state())
+                    continue
+
+                # next box of a comb field: same name apart from the box index, same row
+                group = _comb_group(name)
+                if (kind == "text" and last is not None and last["group"] == group
+                        and abs(widget.rect.y0 - last["rect"].y0) < 3
+                        and -3 <= widget.rect.x0 - last["rect"].x1 < 15):
+                    entry = last["entry"]
+                    entry["value"] += value
+                    entry["field_names"].append(name)
+                    last["rect"] = widget.rect
+                    continue
+
+                key = _field_key(_widget_label(widget, words))
+                if key in section:
+                    suffix = 2
+                    while f"{key}_{suffix}" in section:
+                        suffix += 1
+                    key = f"{key}_{suffix}"
+
+                entry = {"value": value, "type": kind, "field_names": [name]}
+                if widget.choice_values:
+                    entry["options"] = list(widget.choice_values)
+                elif kind == "radiobutton":
+                    entry["options"] = [widget.on_state()]
+                section[key] = entry
+                by_name[name] = entry
+                last = {"group": group, "rect": widget.rect, "entry": entry}
+
+            fields[f"page_{page.number + 1}"] = section
+    return fields
+
+def extract_form_schema_local(pdf_path: str) -> Dict[str, Any]:
+    """Form structure from a fillable PDF's widgets as {"page_N": {field_key: value}},
+    or {} when it has none; see extract_form_fields_local for the widget metadata"""
+    return {
+        page: {key: field["value"] for key, field in section.items()}
+        for page, section in extract_form_fields_local(pdf_path).items()
+    }
+
+def split_pdf_pages(pdf_path: str, pages_per_chunk: int = PDF_PAGES_PER_CHUNK) -> List[Tuple[Tuple[int, int], bytes]]:
+    """Split a PDF in memory into ((first_page, last_page), pdf_bytes) chunks, pages 1-based"""
+    import pymupdf
+
+    chunks = []
+    with pymupdf.open(pdf_path) as doc:
+        for start in range(0, doc.page_count, pages_per_chunk):
+            end = min(start + pages_per_chunk, doc.page_count) - 1
+            with pymupdf.open() as part:
+                part.insert_pdf(doc, from_page=start, to_page=end)
+                # no_new_id keeps the bytes identical across runs, so the response cache can hit
+                chunks.append(((start + 1, end + 1), part.tobytes(garbage=3, deflate=True, no_new_id=True)))
+    return chunks
+
+def _page_range_prompt(pages: Tuple[int, int]) -> str:
+    first, last = pages
+    where = f"page {first}" if first == last else f"pages {first}-{last}"
+    return f"{PDF_FORM_PROMPT} This document is {where} of a longer form; extract only what appears on it."
+
+def _page_range_suffix(pages: Tuple[int, int]) -> str:
+    first, last = pages
+    return f"page_{first}" if first == last else f"pages_{first}-{last}"
+
+def merge_page_schemas(partials: Sequence[Tuple[Tuple[int, int], Dict[str, Any]]]) -> Dict[str, Any]:
+    """Merge per-range schemas in page order.
+
+    Nested sections present in several ranges are merged recursively; a key
+    whose value differs between ranges keeps the first value and the later
+    one is stored as "<key>_<page range>"."""
+    def merge(target: Dict, source: Dict, pages: Tuple[int, int]):
+        for key, value in source.items():
+            if key not in target:
+                target[key] = copy.deepcopy(value)
+            elif isinstance(target[key], dict) and isinstance(value, dict):
+                merge(target[key], value, pages)
+            elif target[key] != value:
+                target[f"{key}_{_page_range_suffix(pages)}"] = copy.deepcopy(value)
+
+    merged = {}
+    for pages, schema in sorted(partials, key=lambda item: item[0]):
+        if isinstance(schema, dict):
+            merge(merged, schema, pages)
+    return merged
+
+def _extract_page_ranges(chunks: Sequence[Tuple[Tuple[int, int], bytes]], concurrency: int) -> Tuple[List, List]:
+    """Run one request per chunk concurrently; returns ([(pages, schema)], [failed chunks])"""
+    responses = generate_batch([(_page_range_prompt(pages), data) for pages, data in chunks],
+                               concurrency, return_exceptions=True, validate=is_json)
+    done, failed = [], []
+    for chunk, response in zip(chunks, responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            schema = json.loads(response)
+            if not isinstance(schema, dict):
+                raise ValueError(f"expected a JSON object, got {type(schema).__name__}")
+            done.append((chunk[0], schema))
+        except Exception:
+            failed.append(chunk)
+    return done, failed
+
+def process_pdf_form_parallel(pdf_path: str, pages_per_chunk: int = PDF_PAGES_PER_CHUNK,
+                              concurrency: int = DEFAULT_CONCURRENCY) -> Tuple[Dict[str, Any], List[int]]:
+    """Extract structure from a multi-page PDF with one concurrent request per page range.
+
+    Ranges that fail (request error, unparseable JSON or not an object) are retried once page
+    by page. Returns (merged schema, pages that
+    still failed)."""
+    chunks = split_pdf_pages(pdf_path, pages_per_chunk)
+    done, failed = _extract_page_ranges(chunks, concurrency)
+
+    if failed:
+        failed_pages = {page for (first, last), _ in failed for page in range(first, last + 1)}
+        retry = [chunk for chunk in split_pdf_pages(pdf_path, 1) if chunk[0][0] in failed_pages]
+        recovered, failed = _extract_page_ranges(retry, concurrency)
+        done.extend(recovered)
+
+    failed_pages = sorted(page for (first, last), _ in failed for page in range(first, last + 1))
+    return merge_page_schemas(done), failed_pages
+
+def process_pdf_form_with_source(pdf_path: str, prefer_local: bool = True,
+                                 parallel: bool = False) -> Tuple[Dict[str, Any], str]:
+    """Extract structure from PDF form; returns (schema, source) with source
+    "acroform", "llm", "partial" (parallel mode, some pages lost) or "failed".
+
+    Fillable PDFs are read locally from their widgets; only non-fillable or
+    scanned forms are sent to the model, whole or (parallel=True) by page range."""
+    if prefer_local:
+        try:
+            schema = extract_form_schema_local(pdf_path)
+            if schema:
+                return schema, "acroform"
+        except Exception:
+            pass
 
-def process_pdf_form(pdf_path: str) -> Dict[str, Any]:
-    """Extract structure from PDF form"""
-    prompt = """Extract form structure as JSON with field names, types, and current values."""
-    
     try:
+        if parallel:
+            schema, failed_pages = process_pdf_form_parallel(pdf_path)
+            if not schema:
+                return {}, "failed"
+            return schema, "partial" if failed_pages else "llm"
+
         with open(pdf_path, "rb") as f:
             pdf_data = f.read()
-        response = generate_with_ai(prompt, pdf_data)
-        return json.loads(response)
+        response = generate_with_ai(PDF_FORM_PROMPT, pdf_data, validate=is_json)
+        return json.loads(response), "llm"
     except:
-        return {}
+        return {}, "failed"
+
+def process_pdf_form(pdf_path: str, prefer_local: bool = True, parallel: bool = False) -> Dict[str, Any]:
+    """Extract structure from PDF form"""
+    return process_pdf_form_with_source(pdf_path, prefer_local, parallel)[0]
 
 # =============================================================================
 # UTILITY FUNCTIONS
@@ -197,6 +945,17 @@ def get_field_values(obj: Dict, prefix: str = "") -> Dict[str, str]:
                 fields[path] = str(value)
     return fields
 
+def get_field_paths(obj: Dict, prefix: str = "", keys: Tuple = ()) -> Dict[str, Tuple]:
+    """Map the dotted path of every leaf field, empty or not, to its key tuple"""
+    paths = {}
+    for key, value in obj.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and value:
+            paths.update(get_field_paths(value, path, keys + (key,)))
+        else:
+            paths[path] = keys + (key,)
+    return paths
+
 def format_field_name(field_name: str) -> str:
     """Clean field names for display"""
     return field_name.replace("_", " ").replace(".", " → ").title()
@@ -205,10 +964,13 @@ def format_field_name(field_name: str) -> str:
 # QUICK FUNCTIONS
 # =============================================================================
 
-def quick_extract(transcript: str, form_type: str = "CMS") -> Dict:
+def quick_extract(transcript: str, form_type: str = "CMS", routed: bool = False,
+                  sectioned: bool = False, output_mode: str = "full") -> Dict:
     """Quick extraction from transcript"""
     template = load_template(form_type)
-    return extract_with_citations(transcript, template, form_type)
+    if routed:
+        return extract_with_routing(transcript, template, form_type, output_mode=output_mode)
+    return extract_with_citations(transcript, template, form_type, sectioned=sectioned, output_mode=output_mode)
 
 def quick_entities(text: str) -> List[Dict]:
     """Quick entity extraction"""
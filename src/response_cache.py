@@ -0,0 +1,105 @@
+"""
+Response Cache - content-addressed on-disk cache for LLM responses
+
+Entries are keyed by a sha256 over (model, prompt, sha256 of the PDF bytes,
+generation params) and stored in SQLite. Entries older than the TTL are treated
+as misses, and the store is trimmed to max_entries by least-recent use.
+
+Values are stored as plaintext. Responses to extraction prompts contain
+patient data, so mono_utils only enables this cache when
+NLP_NURSING_RESPONSE_CACHE is set, and the file must live on storage approved
+for it.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlite_store import SQLiteStore
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)"
+)
+
+
+class ResponseCache:
+    """Bounded SQLite store of model responses with TTL and LRU eviction."""
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._store = SQLiteStore(path, "responses", SCHEMA, max_entries)
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, pdf_data: bytes = None, params: Dict[str, Any] = None) -> str:
+        """Content address of a request"""
+        payload = json.dumps({
+            "model": model,
+            "prompt": prompt,
+            "pdf": hashlib.sha256(pdf_data).hexdigest() if pdf_data else None,
+            "params": params
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._store.connect()
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._store.removed()
+                self.expired += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            conn = self._store.connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # expired entries go before live ones
+            self._store.added(1, purge=("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)))
+            conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self._store.evictions,
+            "entries": self._store.count
+        }
+
+    def close(self):
+        with self._lock:
+            self._store.close()
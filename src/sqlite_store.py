@@ -0,0 +1,78 @@
+"""
+SQLite Store - bounded on-disk table shared by the embedding and response caches
+
+The database is opened on first use (WAL mode, schema created if missing).
+Rows carry a last_used timestamp; once the table grows past max_rows the least
+recently used rows are deleted in one batch, down to EVICTION_TARGET of the
+cap, so eviction runs occasionally rather than on every insert.
+
+Callers hold their own lock around every call.
+"""
+
+import os
+import sqlite3
+from typing import Iterable, Optional, Sequence
+
+# fraction of max_rows kept after an eviction pass
+EVICTION_TARGET = 0.9
+
+
+class SQLiteStore:
+    """One table with a last_used column, trimmed by least-recent use."""
+
+    def __init__(self, path: str, table: str, schema: Sequence[str], max_rows: int):
+        self.path = path
+        self.table = table
+        self.schema = schema
+        self.max_rows = max_rows
+
+        self._conn = None
+        # approximate row count (replacements are counted as inserts), so the
+        # eviction check does not need a COUNT(*) on every write
+        self.count = 0
+        self.evictions = 0
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the database and create the schema on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                self._conn.execute(statement)
+            self.count = self._count()
+        return self._conn
+
+    def _count(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def added(self, rows: int, purge: Optional[Iterable] = None):
+        """Record rows just written and evict if the table is over its cap.
+
+        purge is an optional (sql, params) run before counting, e.g. to drop
+        expired rows so they are removed ahead of live ones. Does not commit."""
+        self.count += rows
+        if self.count <= self.max_rows:
+            return
+        conn = self.connect()
+        if purge is not None:
+            conn.execute(*purge)
+        count = self._count()
+        if count > self.max_rows:
+            excess = count - int(self.max_rows * EVICTION_TARGET)
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"(SELECT rowid FROM {self.table} ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+            count -= excess
+        self.count = count
+
+    def removed(self, rows: int = 1):
+        self.count -= rows
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
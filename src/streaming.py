@@ -1,10 +1,101 @@
+import asyncio
+import hashlib
+import io
+import json
+import mmap
 import os
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
 import numpy as np
+from embedding_cache import EmbeddingCache
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
-#model = SentenceTransformer('pritamdeka/S-PubMedBert-MS-MARCO')
+# sentence encoders selectable through STREAMING_MODEL (an alias below or any
+# SentenceTransformer model name)
+MODEL_ALIASES = {
+    'minilm': 'all-MiniLM-L6-v2',
+    'pubmedbert': 'pritamdeka/S-PubMedBert-MS-MARCO',
+}
+_model_setting = os.getenv('STREAMING_MODEL', 'minilm')
+MODEL_NAME = MODEL_ALIASES.get(_model_setting, _model_setting)
+
+# inference backend (see embedding_backends.BACKENDS): 'sentence-transformers',
+# 'onnx' or 'onnx-int8'
+DEFAULT_BACKEND = 'sentence-transformers'
+BACKEND = os.getenv('STREAMING_BACKEND', DEFAULT_BACKEND)
+
+# on-disk tier of the embedding cache; set STREAMING_EMBEDDING_CACHE to an
+# empty string to keep the cache in memory only
+EMBEDDING_CACHE_PATH = os.getenv(
+    'STREAMING_EMBEDDING_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'nlp-nursing', 'embeddings.sqlite')
+) or None
+# entries kept in the in-memory tier (0 disables it, e.g. to time the encoder)
+EMBEDDING_CACHE_MEMORY_ITEMS = 10000
+
+# the model (and torch) is only loaded on first use, so processes that just
+# parse transcripts never pay for it
+_model = None
+_embedding_cache = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    '''Process-wide embedding backend, loaded on first use'''
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from embedding_backends import create_backend
+                _model = create_backend(BACKEND, MODEL_NAME)
+    return _model
+
+
+def encoder_id():
+    '''Identifies the configured encoder; backends differ slightly, so caches key on it'''
+    return MODEL_NAME if BACKEND == DEFAULT_BACKEND else f"{MODEL_NAME}@{BACKEND}"
+
+
+def get_embedding_cache():
+    '''Process-wide embedding cache for the configured model'''
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _model_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(encoder_id(), EMBEDDING_CACHE_PATH,
+                                                  max_memory_items=EMBEDDING_CACHE_MEMORY_ITEMS)
+    return _embedding_cache
+
+
+def reset_embedding_cache():
+    '''Drop the process-wide cache (e.g. after changing EMBEDDING_CACHE_PATH or
+    EMBEDDING_CACHE_MEMORY_ITEMS)'''
+    global _embedding_cache
+    with _model_lock:
+        if _embedding_cache is not None:
+            _embedding_cache.close()
+        _embedding_cache = None
+
+
+def configure_model(name, backend=None):
+    '''Switch the sentence encoder (alias or model name) and optionally its backend'''
+    global MODEL_NAME, BACKEND, _model, _embedding_cache
+    with _model_lock:
+        MODEL_NAME = MODEL_ALIASES.get(name, name)
+        if backend is not None:
+            BACKEND = backend
+        _model = None
+        if _embedding_cache is not None:
+            _embedding_cache.close()
+        _embedding_cache = None
+
+
+def warm_up():
+    '''Load the model and run one forward pass so the first request is not slow'''
+    get_model().encode(['warm up'])
 
 # lower threshold to bias things towards prev dialogue
 PREV_THRESHOLD = 0.4
@@ -14,86 +105,574 @@ REFERENCE_BACK_THRESHOLD = 0.6
 THRESHOLD = 0.5
 BIAS = 0.025
 
+# incremental mode keeps a running centroid per dialogue instead of
+# re-encoding the whole concatenated dialogue on every append
+INCREMENTAL = False
+# recency weight applied to a dialogue's centroid before each new sentence
+# is added (1.0 = plain mean, lower values favour recent sentences)
+CENTROID_DECAY = 1.0
+
+# cap on dialogues searched for every turn (None = unbounded); beyond it the
+# stalest dialogues are archived and only searched when no active dialogue
+# passes REFERENCE_BACK_THRESHOLD
+MAX_ACTIVE_DIALOGUES = None
+# how many turns of recency one sentence of dialogue size is worth when
+# choosing which dialogue to archive
+ARCHIVE_SIZE_WEIGHT = 1.0
+# cap on archived dialogues kept searchable (None = unbounded); beyond it the
+# stalest archived dialogues are retired and can no longer be referenced back
+MAX_ARCHIVED_DIALOGUES = 256
+
+# storage for dialogue embeddings: 'float32', 'float16' (half the memory) or
+# 'int8' (a quarter, plus one float32 scale per row)
+EMBEDDING_DTYPE = 'float32'
+EMBEDDING_DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+
+# template sections each dialogue is routed to
+IR_TOP_K = 3
+
+# sentences per forward pass when pre-encoding a transcript
+ENCODE_BATCH_SIZE = 64
+
+# speaker label at the start of a transcript line, e.g. "**NURSE:** ..." or "PATIENT: ..."
+SPEAKER_PATTERN = re.compile(r'(NURSE|PATIENT)\**\s*:\**\s*(.*)$')
+
+
+@dataclass
+class Turn:
+    '''One speaker turn; start/end are offsets of its lines in the source'''
+    speaker: str
+    text: str
+    start: int
+    end: int
+
+
+@dataclass
+class Interaction:
+    '''A nurse->patient exchange (or an unpaired turn) with its source span'''
+    text: str
+    start: int
+    end: int
+    turns: List[Turn] = field(default_factory=list)
+
+    @classmethod
+    def from_turns(cls, turns):
+        text = ' '.join(f"{turn.speaker}: {turn.text}" for turn in turns)
+        return cls(text, turns[0].start, turns[-1].end, turns)
+
+
+def iter_turns(source):
+    '''Yield Turns from a transcript in a single pass.
+
+    source may be a string, a text file handle, or a binary file handle / mmap
+    (offsets are then byte offsets). Lines without a speaker label are skipped
+    and consecutive lines from the same speaker are merged into one turn.'''
+    if isinstance(source, str):
+        source = io.StringIO(source)
+
+    current = None
+    offset = 0
+    line = source.readline()
+    while line:
+        line_start = offset
+        offset += len(line)
+        stripped = line.rstrip(b'\r\n' if isinstance(line, bytes) else '\r\n')
+        line_end = line_start + len(stripped)
+        if isinstance(stripped, bytes):
+            stripped = stripped.decode('utf-8', errors='replace')
+
+        match = SPEAKER_PATTERN.search(stripped)
+        if match:
+            speaker, text = match.group(1), match.group(2).strip()
+            if current is not None and current.speaker == speaker:
+                current.text = f"{current.text} {text}" if current.text else text
+                current.end = line_end
+            else:
+                if current is not None:
+                    yield current
+                current = Turn(speaker, text, line_start, line_end)
+        line = source.readline()
+
+    if current is not None:
+        yield current
+
+
+def iter_interactions(turns):
+    '''Pair each nurse turn with the patient turn that answers it.
+
+    A nurse turn with no answer, or a patient turn with no prompt, is yielded
+    on its own rather than being paired with an unrelated line.'''
+    pending = None
+    for turn in turns:
+        if turn.speaker == 'NURSE':
+            if pending is not None:
+                yield Interaction.from_turns([pending])
+            pending = turn
+        else:
+            yield Interaction.from_turns([pending, turn] if pending is not None else [turn])
+            pending = None
+    if pending is not None:
+        yield Interaction.from_turns([pending])
+
+
+def iter_transcript_file(path, use_mmap=False):
+    '''Stream Interactions from a transcript file without reading it whole.
+
+    Offsets are byte offsets into the file.'''
+    with open(path, 'rb') as f:
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from iter_interactions(iter_turns(mapped))
+        else:
+            yield from iter_interactions(iter_turns(f))
+
+
 def parse_interactions(text):
     """Parse transcript into pairs of nurse-patient interactions"""
-    interactions = []
-    lines = text.strip().split('\n')
-    clean_lines = []
-    
-    # First, get all clean lines with nurse/patient interactions
-    for line in lines:
-        clean_line = line.strip()
-        if clean_line and ('**NURSE:**' in clean_line or '**PATIENT:**' in clean_line or 'PATIENT:' in clean_line or 'NURSE:' in clean_line):
-            clean_lines.append(clean_line)
-    
-    # Group pairs of lines together representing one interaction
-    for i in range(0, len(clean_lines), 2):
-        if i + 1 < len(clean_lines):
-            pair = clean_lines[i] + " " + clean_lines[i + 1]
-            interactions.append(pair)
-    
-    return interactions
+    return [interaction.text for interaction in iter_interactions(iter_turns(text))]
 
 
 def load_cms_script():
     script_path = os.path.join(os.path.dirname(__file__), '..', 'outputs', 'sample_scripts', 'disjoint_stress_transcript.txt')
-    with open(script_path, 'r') as f:
-        text = f.read()
-    return parse_interactions(text)
+    return [interaction.text for interaction in iter_transcript_file(script_path)]
 
 
-def get_disjoint_dialogues(sentences):
-    if not sentences:
-        return []
-    
-    dialogues = [[sentences[0]]]
-    dialogue_embeddings = [model.encode(sentences[0])]  # Single sentence, not array
-
-    for i in range(1, len(sentences)):
-        curr_sentence = sentences[i]
-        curr_emb = model.encode(curr_sentence)  # Single sentence embedding
-
-        best_sim, best_idx = -1, None
-        
-        for j, prev_embedding in enumerate(dialogue_embeddings):
-            sim = cosine_similarity([curr_emb], [prev_embedding])[0][0]
-
-            # bias towards prev dialogue
-            if j == len(dialogue_embeddings) - 1:
-                sim += BIAS
-
-            if sim > best_sim:
-                best_sim, best_idx = sim, j
-        
-        if best_sim > THRESHOLD:
-            if best_idx != len(dialogue_embeddings) - 1:
+def normalize(embedding):
+    '''Scale an embedding to unit length so cosine similarity is a dot product'''
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else embedding
+
+
+class DialogueEmbeddings:
+    '''Pre-normalized dialogue embeddings kept as rows of one growable matrix.
+
+    Scoring a sentence against every stored dialogue is a single matrix-vector
+    product instead of one cosine_similarity call per dialogue. Rows are
+    addressed by dialogue id; removing a dialogue moves the last row into its
+    slot, so removal is O(d) as well.
+
+    With dtype='float16' or 'int8' rows are stored compactly (int8 rows carry
+    a per-row scale) and upcast to float32 for the product.'''
+
+    def __init__(self, dim, capacity=64, dtype=EMBEDDING_DTYPE):
+        self.dtype = dtype
+        self.matrix = np.empty((capacity, dim), dtype=EMBEDDING_DTYPES[dtype])
+        self.scales = np.ones(capacity, dtype=np.float32) if dtype == 'int8' else None
+        self.ids = []   # dialogue id of each row
+        self.rows = {}  # dialogue id -> row
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, dialogue_id):
+        return dialogue_id in self.rows
+
+    @property
+    def nbytes(self):
+        '''Bytes held by the stored rows'''
+        size = len(self.ids)
+        total = self.matrix[:size].nbytes
+        if self.scales is not None:
+            total += self.scales[:size].nbytes
+        return total
+
+    def _store(self, row, embedding):
+        vec = normalize(np.asarray(embedding, dtype=np.float32))
+        if self.scales is not None:
+            peak = float(np.max(np.abs(vec))) or 1.0
+            self.matrix[row] = np.round(vec * (127 / peak))
+            self.scales[row] = peak / 127
+        else:
+            self.matrix[row] = vec
+
+    def _load(self, row):
+        vec = self.matrix[row].astype(np.float32)
+        return vec * self.scales[row] if self.scales is not None else vec
+
+    def append(self, dialogue_id, embedding):
+        size = len(self.ids)
+        if size == len(self.matrix):
+            # grow geometrically so appends stay amortised O(d)
+            grown = np.empty((2 * len(self.matrix), self.matrix.shape[1]), dtype=self.matrix.dtype)
+            grown[:size] = self.matrix[:size]
+            self.matrix = grown
+            if self.scales is not None:
+                self.scales = np.concatenate([self.scales, np.ones(len(self.scales), dtype=np.float32)])
+        self._store(size, embedding)
+        self.rows[dialogue_id] = size
+        self.ids.append(dialogue_id)
+
+    def get(self, dialogue_id):
+        '''Stored (normalized) embedding of a dialogue as float32'''
+        return self._load(self.rows[dialogue_id])
+
+    def update(self, dialogue_id, embedding):
+        self._store(self.rows[dialogue_id], embedding)
+
+    def remove(self, dialogue_id):
+        '''Drop a dialogue and return its (normalized) embedding'''
+        row = self.rows.pop(dialogue_id)
+        embedding = self._load(row)
+        last = len(self.ids) - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            if self.scales is not None:
+                self.scales[row] = self.scales[last]
+            self.ids[row] = self.ids[last]
+            self.rows[self.ids[row]] = row
+        self.ids.pop()
+        return embedding
+
+    def similarities(self, embedding):
+        '''Cosine similarity of embedding against every row'''
+        size = len(self.ids)
+        query = normalize(np.asarray(embedding, dtype=np.float32))
+        if self.matrix.dtype == np.float32:
+            return self.matrix[:size] @ query
+        sims = self.matrix[:size].astype(np.float32) @ query
+        if self.scales is not None:
+            sims *= self.scales[:size]
+        return sims
+
+
+def update_centroid(centroid, embedding, decay=CENTROID_DECAY):
+    '''Fold a sentence embedding into a dialogue's running centroid in O(d).
+
+    The centroid is kept as a (decayed) sum; cosine similarity ignores the
+    scale, so the sum ranks the same as the weighted mean.'''
+    return decay * centroid + embedding
+
+
+def encode_sentences(sentences, batch_size=ENCODE_BATCH_SIZE):
+    '''Encode every sentence in one batched call; returns an (n, d) matrix.
+
+    Goes through embedding_cache, so only texts never seen before by this
+    model reach the encoder.'''
+    return get_embedding_cache().encode(
+        sentences,
+        lambda texts: get_model().encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    )
+
+
+def encode_text(text):
+    '''Encode a single text (e.g. a whole dialogue) through the cache'''
+    return encode_sentences([text])[0]
+
+
+def get_cache_stats():
+    '''Hit/miss counters of the embedding cache'''
+    return get_embedding_cache().stats()
+
+
+# kinds of SegmentEvent
+NEW_DIALOGUE = 'new'
+CONTINUE = 'continue'
+REFERENCE_BACK = 'reference_back'
+
+
+@dataclass
+class SegmentEvent:
+    '''Assignment of one turn to a dialogue'''
+    turn: int
+    kind: str
+    dialogue: int
+    similarity: Optional[float]
+    text: str
+
+
+class DialogueSegmenter:
+    '''Online form of get_disjoint_dialogues: assigns each turn as it arrives.
+
+    Each add() does one sentence encode plus one matrix-vector product over the
+    active dialogues, and in incremental mode an O(d) centroid update; the
+    default re-encode mode also re-encodes the chosen dialogue, so prefer
+    incremental=True for live use. With max_active set (and max_archived
+    bounding the cold-store fallback), per-turn cost stays flat however long
+    the session runs.'''
+
+    def __init__(self, incremental=INCREMENTAL, decay=CENTROID_DECAY,
+                 threshold=None, bias=None, reference_back_threshold=None,
+                 max_active=MAX_ACTIVE_DIALOGUES, embedding_dtype=None,
+                 max_archived=MAX_ARCHIVED_DIALOGUES):
+        if max_active is not None and max_active < 1:
+            raise ValueError(f"max_active must be at least 1, got {max_active}")
+        if max_archived is not None and max_archived < 0:
+            raise ValueError(f"max_archived must be non-negative, got {max_archived}")
+        self.incremental = incremental
+        self.decay = decay
+        # read the module settings at construction so they can be tuned at runtime
+        self.threshold = THRESHOLD if threshold is None else threshold
+        self.bias = BIAS if bias is None else bias
+        self.reference_back_threshold = (REFERENCE_BACK_THRESHOLD if reference_back_threshold is None
+                                         else reference_back_threshold)
+        self.max_active = max_active
+        self.max_archived = max_archived
+        self.embedding_dtype = EMBEDDING_DTYPE if embedding_dtype is None else embedding_dtype
+
+        self.dialogues = []
+        self.turns = 0
+        self._active = None
+        # cold store for dialogues pushed out of the active window
+        self._archive = None
+        # norm of each dialogue's raw centroid sum; together with the stored
+        # unit vector it reconstructs the centroid (incremental mode only)
+        self._weights = []
+        self._last_used = []
+
+    def _open_dialogue(self, sentence, embedding, similarity):
+        if self._active is None:
+            self._active = DialogueEmbeddings(len(embedding), dtype=self.embedding_dtype)
+            self._archive = DialogueEmbeddings(len(embedding), dtype=self.embedding_dtype)
+        dialogue_idx = len(self.dialogues)
+        self.dialogues.append([sentence])
+        self._active.append(dialogue_idx, embedding)
+        self._weights.append(float(np.linalg.norm(embedding)))
+        self._last_used.append(self.turns)
+        return SegmentEvent(self.turns, NEW_DIALOGUE, dialogue_idx, similarity, sentence)
+
+    def _staleness(self, idx):
+        return self._last_used[idx] + ARCHIVE_SIZE_WEIGHT * len(self.dialogues[idx])
+
+    def _enforce_window(self):
+        '''Archive the stalest, smallest dialogues until the active window fits,
+        then retire archived ones beyond max_archived so the fallback scan stays bounded'''
+        if self.max_active is None:
+            return
+        newest = len(self.dialogues) - 1
+        while len(self._active) > self.max_active:
+            victim = min((idx for idx in self._active.ids if idx != newest), key=self._staleness)
+            self._archive.append(victim, self._active.remove(victim))
+        if self.max_archived is not None:
+            while len(self._archive) > self.max_archived:
+                self._archive.remove(min(self._archive.ids, key=self._staleness))
+
+    def add(self, sentence, embedding=None):
+        '''Assign one turn; returns the SegmentEvent describing where it went'''
+        if embedding is None:
+            embedding = encode_text(sentence)
+
+        if not self.dialogues:
+            event = self._open_dialogue(sentence, embedding, None)
+            self.turns += 1
+            return event
+
+        last_idx = len(self.dialogues) - 1
+        sims = self._active.similarities(embedding)
+        # bias towards prev dialogue
+        sims[self._active.rows[last_idx]] += self.bias
+        best_row = int(np.argmax(sims))
+        best_idx, best_sim = self._active.ids[best_row], float(sims[best_row])
+
+        # only fall back to the cold store when nothing active is a strong match
+        # (and always when nothing active would be accepted at all)
+        if len(self._archive) and best_sim <= max(self.reference_back_threshold, self.threshold):
+            archived_sims = self._archive.similarities(embedding)
+            row = int(np.argmax(archived_sims))
+            if archived_sims[row] > best_sim:
+                best_idx, best_sim = self._archive.ids[row], float(archived_sims[row])
+
+        if best_sim > self.threshold:
+            if best_idx in self._archive:
+                self._active.append(best_idx, self._archive.remove(best_idx))
+            if best_idx != last_idx:
                 # to denote reference back case
-                dialogues[best_idx].append('...\n')
-                dialogues[best_idx].append(curr_sentence)
-                string = ''.join(dialogues[best_idx])
+                self.dialogues[best_idx].append('...\n')
+            self.dialogues[best_idx].append(sentence)
+            self._last_used[best_idx] = self.turns
 
-                dialogue_embeddings[best_idx] = model.encode(string)
+            if self.incremental:
+                centroid = self._weights[best_idx] * self._active.get(best_idx)
+                centroid = update_centroid(centroid, embedding, self.decay)
+                self._weights[best_idx] = float(np.linalg.norm(centroid))
+                self._active.update(best_idx, centroid)
             else:
-                # if last dialogue
-                dialogues[best_idx].append(curr_sentence)
-                dialogue_embeddings[best_idx] = model.encode(''.join(dialogues[best_idx]))
+                self._active.update(best_idx, encode_text(''.join(self.dialogues[best_idx])))
+
+            kind = CONTINUE if best_idx == last_idx else REFERENCE_BACK
+            event = SegmentEvent(self.turns, kind, best_idx, best_sim, sentence)
         else:
-            dialogues.append([curr_sentence])
-            dialogue_embeddings.append(model.encode(curr_sentence))
-    
-    return dialogues
+            event = self._open_dialogue(sentence, embedding, best_sim)
+
+        self._enforce_window()
+        self.turns += 1
+        return event
+
+    def feed(self, sentences):
+        '''Assign turns from any iterable, yielding one event per turn'''
+        for sentence in sentences:
+            yield self.add(sentence)
+
+    async def afeed(self, sentences):
+        '''Async variant of feed; encoding runs off the event loop'''
+        loop = asyncio.get_running_loop()
+        async for sentence in sentences:
+            yield await loop.run_in_executor(None, self.add, sentence)
+
+
+def get_disjoint_dialogues(sentences, incremental=INCREMENTAL, decay=CENTROID_DECAY,
+                           embeddings=None, batch_size=ENCODE_BATCH_SIZE,
+                           max_active=MAX_ACTIVE_DIALOGUES, embedding_dtype=None,
+                           max_archived=MAX_ARCHIVED_DIALOGUES):
+    '''Group sentences into topical dialogues.
+
+    All sentences are encoded up front in batches (or taken from a precomputed
+    embeddings matrix) and fed through a DialogueSegmenter. With
+    incremental=False each dialogue is re-encoded as a whole after every
+    append; with incremental=True each sentence embedding is folded into the
+    dialogue centroid (see update_centroid). max_active bounds the number of
+    dialogues searched per turn, max_archived the fallback search over the
+    dialogues beyond it, and embedding_dtype their storage (see
+    DialogueSegmenter and DialogueEmbeddings).'''
+    if not sentences:
+        return []
+    if embeddings is None:
+        embeddings = encode_sentences(sentences, batch_size)
+
+    segmenter = DialogueSegmenter(incremental, decay, max_active=max_active,
+                                  embedding_dtype=embedding_dtype, max_archived=max_archived)
+    for sentence, embedding in zip(sentences, embeddings):
+        segmenter.add(sentence, embedding)
+    return segmenter.dialogues
+
+def rand_index(labels_a, labels_b):
+    '''Fraction of turn pairs on which two segmentations agree (same vs different dialogue)'''
+    n = len(labels_a)
+    if n < 2:
+        return 1.0
+    pairs = lambda counts: sum(c * (c - 1) // 2 for c in counts)
+    joint = pairs(Counter(zip(labels_a, labels_b)).values())
+    same_a = pairs(Counter(labels_a).values())
+    same_b = pairs(Counter(labels_b).values())
+    total = n * (n - 1) // 2
+    return (total + 2 * joint - same_a - same_b) / total
+
+
+def compare_embedding_dtypes(sentences, embeddings=None, incremental=INCREMENTAL,
+                             dtypes=tuple(EMBEDDING_DTYPES)):
+    '''Segment with each storage dtype and measure the impact against float32.
+
+    Returns {dtype: {dialogues, rand_index, turn_agreement, store_bytes, seconds}}
+    where rand_index / turn_agreement compare turn assignments with float32.'''
+    if embeddings is None:
+        embeddings = encode_sentences(sentences)
+
+    results = {}
+    reference = None
+    for dtype in ('float32',) + tuple(d for d in dtypes if d != 'float32'):
+        segmenter = DialogueSegmenter(incremental, embedding_dtype=dtype)
+        start = time.perf_counter()
+        labels = [segmenter.add(sentence, embedding).dialogue
+                  for sentence, embedding in zip(sentences, embeddings)]
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = labels
+        store = segmenter._active
+        results[dtype] = {
+            "dialogues": len(segmenter.dialogues),
+            "rand_index": round(rand_index(reference, labels), 4),
+            "turn_agreement": round(sum(a == b for a, b in zip(reference, labels)) / max(1, len(labels)), 4),
+            "store_bytes": (store.nbytes + segmenter._archive.nbytes) if store is not None else 0,
+            "seconds": round(elapsed, 4)
+        }
+    return results
+
+# field embeddings per (model, template), so each template is embedded once;
+# least recently used templates beyond IR_SEMANTICS_CACHE_SIZE are dropped
+IR_SEMANTICS_CACHE_SIZE = 16
+_ir_semantics = OrderedDict()
+
+
+@dataclass
+class IRSemantics:
+    '''Field key paths of a template and their normalized embeddings (one row each)'''
+    paths: List[tuple]
+    embeddings: np.ndarray
+
+
+def iter_field_paths(ir, keys=()):
+    '''Yield the key tuple of every leaf field in a template, empty or not.
+
+    Tuples rather than dotted strings, since template keys may contain dots
+    (e.g. "M1000. Pain Assessment").'''
+    for key, value in ir.items():
+        if isinstance(value, dict) and value:
+            yield from iter_field_paths(value, keys + (key,))
+        else:
+            yield keys + (key,)
+
+
+def construct_string(path):
+    '''Readable text for a field key path, used as its embedding input'''
+    return ' > '.join(str(key).replace('_', ' ') for key in path)
 
-def construct_string(ir):
-    pass
 
 def create_ir_semantics(ir):
-    '''Iterate through given ir; create and place semantics'''
-    # iterate through information
-    pass
+    '''Embed every field path of the template once and cache the result.
+
+    Finding the cache entry serializes and hashes the whole template, so
+    callers scoring many dialogues should call this once (see score_sections).'''
+    key = (encoder_id(), hashlib.sha1(json.dumps(ir, sort_keys=True).encode('utf-8')).hexdigest())
+    if key in _ir_semantics:
+        _ir_semantics.move_to_end(key)
+        return _ir_semantics[key]
+    paths = list(iter_field_paths(ir))
+    embeddings = encode_sentences([construct_string(path) for path in paths]) if paths else np.empty((0, 0))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True) if paths else 1
+    semantics = IRSemantics(paths, embeddings / np.maximum(norms, 1e-12))
+    _ir_semantics[key] = semantics
+    while len(_ir_semantics) > IR_SEMANTICS_CACHE_SIZE:
+        _ir_semantics.popitem(last=False)
+    return semantics
+
+
+def get_ir_semantics(dialogue_semantics, ir, top_k=IR_TOP_K):
+    '''Top-k template sections for a dialogue embedding.
+
+    A section (top-level key of the template) scores as its best-matching
+    field. Returns [(section, score), ...] best first.'''
+    return score_sections(dialogue_semantics, create_ir_semantics(ir), top_k)
+
+
+def score_sections(dialogue_semantics, semantics, top_k=IR_TOP_K):
+    '''get_ir_semantics against already embedded template fields (an IRSemantics)'''
+    if not semantics.paths:
+        return []
+    sims = semantics.embeddings @ normalize(np.asarray(dialogue_semantics, dtype=np.float32))
 
-def get_ir_semantics(dialogue_semantics, ir):
-    '''Get semantically similar parts of ir structure to given dialogue'''
-    pass
+    section_scores = {}
+    for path, sim in zip(semantics.paths, sims):
+        section = path[0]
+        section_scores[section] = max(section_scores.get(section, -1.0), float(sim))
+    return sorted(section_scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+def dialogue_text(dialogue):
+    '''Join a dialogue's interactions, dropping reference-back markers'''
+    return '\n'.join(interaction for interaction in dialogue if interaction.strip() != '...')
+
+
+def route_dialogues(dialogues, ir, top_k=IR_TOP_K):
+    '''Route each dialogue to its top-k template sections; returns {section: [dialogue text]}'''
+    texts = [dialogue_text(dialogue) for dialogue in dialogues]
+    routes = {}
+    if not texts:
+        return routes
+    semantics = create_ir_semantics(ir)
+    for text, embedding in zip(texts, encode_sentences(texts)):
+        for section, _ in score_sections(embedding, semantics, top_k):
+            routes.setdefault(section, []).append(text)
+    return routes
+
+
+def plan_routed_extraction(transcript, ir, top_k=IR_TOP_K):
+    '''Split a transcript into per-section extraction inputs.
+
+    Returns {section: transcript excerpt} with only the dialogues routed to
+    that section, in dialogue order. Sections nothing was routed to are
+    left out; an empty plan means the transcript had no speaker turns.'''
+    interactions = parse_interactions(transcript)
+    dialogues = get_disjoint_dialogues(interactions)
+    return {section: '\n\n'.join(texts) for section, texts in route_dialogues(dialogues, ir, top_k).items()}
 
 def main():
     interactions = load_cms_script()
@@ -0,0 +1,162 @@
+"""
+Segmentation Sweep - grid search over segmentation thresholds on cached embeddings
+
+Sentence embeddings are computed once, written to a .npy file and memory-mapped
+read-only by every worker, so each setting only re-runs the (cheap) assignment
+loop. Settings are scored against labelled dialogue boundaries.
+
+Incremental (centroid) segmentation is swept: the re-encode mode needs the
+encoder for every append and cannot run on precomputed embeddings.
+
+Labels are one dialogue/topic label per interaction, as a JSON list or
+{"labels": [...]}.
+
+Usage:
+    python sweep_segmentation.py <transcript.txt> <labels.json> [grid options]
+    python sweep_segmentation.py --synthetic 2000 [grid options]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# set in each worker by _init_worker
+_embeddings = None
+_labels = None
+
+
+def boundaries(labels: Sequence) -> set:
+    """Indices where a new dialogue starts relative to the previous interaction"""
+    return {i for i in range(1, len(labels)) if labels[i] != labels[i - 1]}
+
+
+def boundary_f1(predicted: Sequence, gold: Sequence) -> Dict[str, float]:
+    """Precision / recall / F1 of predicted dialogue boundaries"""
+    pred, true = boundaries(predicted), boundaries(gold)
+    hits = len(pred & true)
+    precision = hits / len(pred) if pred else float(not true)
+    recall = hits / len(true) if true else float(not pred)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def _init_worker(embeddings_path, labels):
+    global _embeddings, _labels
+    _embeddings = np.load(embeddings_path, mmap_mode='r')
+    _labels = labels
+
+
+def _evaluate(setting):
+    import streaming
+
+    start = time.perf_counter()
+    segmenter = streaming.DialogueSegmenter(incremental=True, **setting)
+    predicted = [segmenter.add(str(i), embedding).dialogue for i, embedding in enumerate(_embeddings)]
+    elapsed = time.perf_counter() - start
+
+    scores = boundary_f1(predicted, _labels)
+    return {
+        **setting,
+        **{k: round(v, 4) for k, v in scores.items()},
+        "rand_index": round(streaming.rand_index(_labels, predicted), 4),
+        "dialogues": len(segmenter.dialogues),
+        "seconds": round(elapsed, 4)
+    }
+
+
+def build_grid(**axes: List) -> List[Dict]:
+    """Cartesian product of parameter lists, skipping axes given as None"""
+    axes = {name: values for name, values in axes.items() if values}
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes.values())]
+
+
+def sweep(embeddings: np.ndarray, labels: List, grid: List[Dict], workers: int = None) -> List[Dict]:
+    """Evaluate every setting in the grid; results sorted by boundary F1"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.npy")
+        np.save(path, np.asarray(embeddings, dtype=np.float32))
+        with Pool(processes=workers, initializer=_init_worker, initargs=(path, list(labels))) as pool:
+            results = pool.map(_evaluate, grid, chunksize=max(1, len(grid) // (4 * (workers or os.cpu_count() or 1))))
+    return sorted(results, key=lambda r: r["f1"], reverse=True)
+
+
+def load_labels(path: str) -> List:
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data["labels"] if isinstance(data, dict) else data
+
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep segmentation thresholds against labelled boundaries")
+    parser.add_argument("transcript", nargs="?", help="transcript file")
+    parser.add_argument("labels", nargs="?", help="JSON labels, one per interaction")
+    parser.add_argument("--synthetic", type=int, help="use a generated transcript of this many turns instead")
+    parser.add_argument("--thresholds", type=_floats, default=[0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65])
+    parser.add_argument("--biases", type=_floats, default=[0.0, 0.025, 0.05, 0.1])
+    parser.add_argument("--reference-back-thresholds", type=_floats, default=None,
+                        help="only searched with --max-active: archived dialogues exist only then")
+    parser.add_argument("--decays", type=_floats, default=[1.0, 0.9, 0.7])
+    parser.add_argument("--max-active", type=lambda t: [int(v) for v in t.split(",")], default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10, help="settings to print")
+    parser.add_argument("--output", help="write all results to this JSON file")
+    args = parser.parse_args()
+    if args.reference_back_thresholds and not args.max_active:
+        parser.error("--reference-back-thresholds has no effect without --max-active")
+
+    import streaming
+
+    if args.synthetic:
+        from benchmark_segmentation import generate_transcript
+        text, labels = generate_transcript(args.synthetic)
+    elif args.transcript and args.labels:
+        with open(args.transcript, 'r') as f:
+            text = f.read()
+        labels = load_labels(args.labels)
+    else:
+        parser.error("give a transcript and labels, or --synthetic N")
+
+    sentences = streaming.parse_interactions(text)
+    if len(sentences) != len(labels):
+        sys.exit(f"{len(sentences)} interactions but {len(labels)} labels")
+
+    start = time.time()
+    embeddings = streaming.encode_sentences(sentences)
+    encode_seconds = time.time() - start
+
+    grid = build_grid(
+        threshold=args.thresholds,
+        bias=args.biases,
+        reference_back_threshold=args.reference_back_thresholds,
+        decay=args.decays,
+        max_active=args.max_active
+    )
+    start = time.time()
+    results = sweep(embeddings, labels, grid, args.workers)
+    sweep_seconds = time.time() - start
+
+    print(f"encoded {len(sentences)} interactions in {encode_seconds:.2f}s; "
+          f"{len(grid)} settings in {sweep_seconds:.2f}s")
+    for result in results[:args.top]:
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Tolerant JSON - incremental parser that keeps every value completed so far
+
+Model responses can be truncated (output token limit, dropped stream) or break
+part-way (a stray character). json.loads rejects the whole document in both
+cases. IncrementalJSONParser consumes text in chunks, reports each value the
+moment it is complete, and stops at the first syntax error, so everything
+before the break is kept.
+
+Tolerated: text before the document (prose, code fences, even brackets in
+prose such as "[as requested]": a start that breaks before any value completes
+is taken as prose and scanning resumes after it), trailing commas and raw
+control characters inside strings.
+
+Usage:
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        for path, value in parser.feed(chunk):
+            ...
+    root, events, complete = parse_partial(text)
+"""
+
+import json
+from typing import Any, List, Tuple
+
+# characters that can continue a number / true / false / null
+LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+LITERAL_START = set("-0123456789tfn")
+
+# frame states: expecting a key (or '}'), ':', a value (or ']'), ',' or a close
+KEY, COLON, VALUE, NEXT = "key", "colon", "value", "next"
+
+
+class _Frame:
+    __slots__ = ("container", "path", "state", "key")
+
+    def __init__(self, container, path: Tuple):
+        self.container = container
+        self.path = path
+        self.state = KEY if isinstance(container, dict) else VALUE
+        self.key = None
+
+
+class IncrementalJSONParser:
+    """Streaming JSON parser that reports (path, value) for every completed value.
+
+    A path is the tuple of keys / list indices from the root. Containers are
+    reported when they close, after all of their children. `root` always
+    holds the partial document: open containers appear with only their
+    completed children.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.complete = False
+        self.error = None
+        self._stack: List[_Frame] = []
+        self._token = None
+        self._token_kind = None
+        self._escape = False
+        self._events = []
+        # text since the document opened, kept until its first value completes
+        self._replay = None
+
+    def feed(self, text: str) -> List[Tuple[Tuple, Any]]:
+        """Consume a chunk; returns the values completed by it"""
+        self._events = []
+        while text:
+            text = self._consume(text)
+        return self._events
+
+    def _consume(self, text: str) -> str:
+        """Parse text; returns what is left to rescan after a false document start"""
+        for position, ch in enumerate(text):
+            if self.complete or self.error:
+                break
+            if self._replay is not None:
+                self._replay.append(ch)
+            try:
+                self._step(ch)
+            except ValueError as e:
+                if self._replay is not None:
+                    # nothing completed yet, so the opening bracket was prose: rescan after it
+                    rest = "".join(self._replay[1:]) + text[position + 1:]
+                    self._restart()
+                    return rest
+                self.error = f"{e} at chunk offset {position}"
+        return ""
+
+    def _restart(self):
+        self.root = None
+        self._stack = []
+        self._token = self._token_kind = None
+        self._escape = False
+        self._replay = None
+
+    def _step(self, ch: str):
+        if self._token_kind == "string":
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                raw = "".join(self._token)
+                self._token = self._token_kind = None
+                self._string_done(json.loads(f'"{raw}"', strict=False))
+                return
+            self._token.append(ch)
+            return
+
+        if self._token_kind == "literal":
+            if ch in LITERAL_CHARS:
+                self._token.append(ch)
+                return
+            literal = "".join(self._token)
+            self._token = self._token_kind = None
+            try:
+                value = json.loads(literal)
+            except json.JSONDecodeError:
+                raise ValueError(f"bad literal {literal!r}")
+            self._value_done(value)
+
+        if ch.isspace():
+            return
+
+        if not self._stack:
+            # skip anything before the document starts
+            if ch in "{[":
+                self._open({} if ch == "{" else [])
+            return
+
+        frame = self._stack[-1]
+        if frame.state == KEY:
+            if ch == '"':
+                self._token, self._token_kind = [], "string"
+            elif ch == "}":
+                self._close()
+            else:
+                raise ValueError(f"expected key, got {ch!r}")
+        elif frame.state == COLON:
+            if ch != ":":
+                raise ValueError(f"expected ':', got {ch!r}")
+            frame.state = VALUE
+        elif frame.state == VALUE:
+            if ch == '"':
+                self._token, self._token_kind = [], "string"
+            elif ch in "{[":
+                self._open({} if ch == "{" else [])
+            elif ch == "]" and isinstance(frame.container, list):
+                self._close()
+            elif ch in LITERAL_START:
+                self._token, self._token_kind = [ch], "literal"
+            else:
+                raise ValueError(f"expected value, got {ch!r}")
+        else:
+            if ch == ",":
+                frame.state = KEY if isinstance(frame.container, dict) else VALUE
+            elif (ch == "}") == isinstance(frame.container, dict) and ch in "}]":
+                self._close()
+            else:
+                raise ValueError(f"expected ',' or close, got {ch!r}")
+
+    def _child_path(self, frame: _Frame) -> Tuple:
+        if isinstance(frame.container, dict):
+            return frame.path + (frame.key,)
+        return frame.path + (len(frame.container),)
+
+    def _open(self, container):
+        if not self._stack:
+            self.root = container
+            self._replay = [("{" if isinstance(container, dict) else "[")]
+            path = ()
+        else:
+            parent = self._stack[-1]
+            path = self._child_path(parent)
+            if isinstance(parent.container, dict):
+                parent.container[parent.key] = container
+            else:
+                parent.container.append(container)
+        self._stack.append(_Frame(container, path))
+
+    def _close(self):
+        self._replay = None
+        frame = self._stack.pop()
+        self._events.append((frame.path, frame.container))
+        if self._stack:
+            self._stack[-1].state = NEXT
+        else:
+            self.complete = True
+
+    def _string_done(self, value: str):
+        frame = self._stack[-1]
+        if frame.state == KEY:
+            frame.key = value
+            frame.state = COLON
+        else:
+            self._value_done(value)
+
+    def _value_done(self, value):
+        self._replay = None
+        frame = self._stack[-1]
+        path = self._child_path(frame)
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        frame.state = NEXT
+        self._events.append((path, value))
+
+
+def parse_partial(text: str) -> Tuple[Any, List[Tuple[Tuple, Any]], bool]:
+    """Parse as much of text as possible; returns (partial root, completed values, complete)"""
+    parser = IncrementalJSONParser()
+    events = parser.feed(text)
+    return parser.root, events, parser.complete
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# modules in src/ and utils/ import each other by bare name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("src", "utils"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
@@ -0,0 +1,13 @@
+import benchmark_segmentation
+import streaming
+
+
+def test_interactions_are_distinct():
+    text, labels = benchmark_segmentation.generate_transcript(10000)
+    interactions = streaming.parse_interactions(text)
+    assert len(interactions) == len(labels) == 10000
+    assert len(set(interactions)) == 10000
+
+
+def test_transcript_is_seeded():
+    assert benchmark_segmentation.generate_transcript(50, seed=3) == benchmark_segmentation.generate_transcript(50, seed=3)
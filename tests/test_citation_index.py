@@ -0,0 +1,48 @@
+import pytest
+
+from citation_index import EXACT, FUZZY, NOT_FOUND, TranscriptIndex
+
+TRANSCRIPT = ("**NURSE:** How fast was your heart rate this morning?\n"
+              "**PATIENT:** It was 110 bpm, and I know my weight went up three pounds.")
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TranscriptIndex(TRANSCRIPT)
+
+
+def test_exact_quote_resolves_to_original_offsets(index):
+    match = index.verify("it was 110 BPM and I know")
+    assert match.status == EXACT
+    assert TRANSCRIPT[match.start:match.end] == "It was 110 bpm, and I know"
+
+
+@pytest.mark.parametrize("quote", ["10 bpm", "now my weight", "was 11", "eart rate"])
+def test_partial_words_are_not_exact_matches(index, quote):
+    assert index.verify(quote).status != EXACT
+
+
+@pytest.mark.parametrize("quote", ["It was", "three pounds", "NURSE: How fast"])
+def test_quotes_at_text_edges_and_markup_match(index, quote):
+    assert index.verify(quote).status == EXACT
+
+
+def test_fuzzy_match_tolerates_a_misspelt_word(index):
+    match = index.verify("and I know my wieght went up three pounds")
+    assert match.status == FUZZY
+    assert TRANSCRIPT[match.start:match.end] == "and I know my weight went up three pounds"
+
+
+def test_invented_quote_is_not_found(index):
+    assert index.verify("patient denies chest pain").status == NOT_FOUND
+    assert index.verify("").status == NOT_FOUND
+
+
+def test_elided_quote_is_checked_in_order(index):
+    assert index.verify("heart rate ... 110 bpm").found
+    assert not index.verify("110 bpm ... heart rate").found
+
+
+def test_fuzzy_match_rejects_a_changed_number(index):
+    assert index.verify("It was 10 bpm, and I know my weight went up").status == NOT_FOUND
+    assert index.verify("It was 110 bpm, and I knwo my weight went up").status == FUZZY
@@ -0,0 +1,38 @@
+import os
+import re
+
+import pytest
+
+pytest.importorskip("pymupdf")
+
+import mono_utils
+
+CMS_FORM = os.path.join(os.path.dirname(__file__), "..", "data", "pdf", "CMS_Form.pdf")
+
+
+def test_leaves_are_values():
+    schema = mono_utils.extract_form_schema_local(CMS_FORM)
+    paths = mono_utils.get_field_paths(schema)
+    assert paths and all(not path.endswith((".type", ".field_names", ".value")) for path in paths)
+    assert all(isinstance(value, str) for value in mono_utils.get_field_values(schema).values())
+
+
+def test_labels():
+    page = mono_utils.extract_form_schema_local(CMS_FORM)["page_1"]
+    assert {"hcpcs_code", "hcpcs_code_2", "hcpcs_code_3", "hcpcs_code_4", "dob_2"} <= set(page)
+    assert not any(key == "field" or key.startswith("field_") for key in page)
+
+
+def test_answer_widgets_carry_their_question():
+    page = mono_utils.extract_form_schema_local(CMS_FORM)["page_1"]
+    assert not any(re.fullmatch(r"(yes|no|y|n|does_not_apply|month_answers)(_\d+)?", key) for key in page)
+    assert {"1_is_the_device_being_ordered_for_the_yes", "1_is_the_device_being_ordered_for_the_no",
+            "7_if_a_bilevel_device_is_ordered_has_does_not_apply",
+            "2_enter_date_of_initial_face_to_face_evaluation_month"} <= set(page)
+
+
+def test_comb_boxes_merge_into_one_field():
+    page = mono_utils.extract_form_fields_local(CMS_FORM)["page_1"]
+    assert len(page["telephone_number_2"]["field_names"]) == 10
+    assert len(page["physicians_telephone_number"]["field_names"]) == 10
+    assert "telephone_number_3" not in page
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+# SDKs that must stay lazy: importing the helpers needs no GCP credentials or client setup
+HEAVY_MODULES = ("google", "vertexai", "langextract", "dotenv")
+
+
+def test_mono_utils_import_stays_light():
+    probe = "import sys, mono_utils; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                            cwd=SRC, capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    # -X importtime logs one "import time: self | cumulative | name" line per module
+    timed = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+    for name in HEAVY_MODULES:
+        assert name not in loaded
+        assert not any(module == name or module.startswith(f"{name}.") for module in timed)
@@ -0,0 +1,70 @@
+import mono_utils
+
+
+def fresh(monkeypatch):
+    # .env loading itself needs python-dotenv; the settings only need os.environ
+    monkeypatch.setattr(mono_utils, "_env_loaded", True)
+    monkeypatch.setattr(mono_utils, "_resilience", None)
+    monkeypatch.setattr(mono_utils, "_response_cache", None)
+
+
+def test_settings_are_read_after_import(monkeypatch):
+    fresh(monkeypatch)
+    monkeypatch.setenv("MAX_RETRIES", "5")
+    monkeypatch.setenv("GEMINI_TIMEOUT_SECONDS", "300")
+    monkeypatch.setenv("MODEL_RATE_LIMIT", "2")
+    policy = mono_utils.get_resilience()
+    assert (policy.max_retries, policy.timeout_seconds, policy.limiter.rate) == (5, 300.0, 2.0)
+
+
+def test_gemini_deadline_ignores_processing_config_timeout(monkeypatch):
+    fresh(monkeypatch)
+    monkeypatch.setenv("TIMEOUT_SECONDS", "30")
+    monkeypatch.delenv("GEMINI_TIMEOUT_SECONDS", raising=False)
+    assert mono_utils.get_resilience().timeout_seconds == mono_utils.DEFAULT_MODEL_TIMEOUT_SECONDS
+
+
+def test_response_cache_path_is_read_after_import(monkeypatch, tmp_path):
+    fresh(monkeypatch)
+    monkeypatch.setenv("NLP_NURSING_RESPONSE_CACHE", str(tmp_path / "responses.sqlite"))
+    assert mono_utils.get_response_cache().path == str(tmp_path / "responses.sqlite")
+    mono_utils.get_response_cache().close()
+
+
+def test_response_cache_is_off_unless_configured(monkeypatch):
+    fresh(monkeypatch)
+    monkeypatch.delenv("NLP_NURSING_RESPONSE_CACHE", raising=False)
+    assert mono_utils.get_response_cache() is None
+
+
+class Response:
+    text = '{"ok": 1}'
+
+
+class Models:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, **kwargs):
+        self.calls += 1
+        return Response()
+
+
+class Client:
+    def __init__(self):
+        self.models = Models()
+
+
+def test_store_false_bypasses_the_cache(monkeypatch, tmp_path):
+    fresh(monkeypatch)
+    monkeypatch.setenv("NLP_NURSING_RESPONSE_CACHE", str(tmp_path / "responses.sqlite"))
+    client = Client()
+    monkeypatch.setattr(mono_utils, "_client", client)
+    monkeypatch.setattr(mono_utils, "_build_contents", lambda prompt, pdf_data=None: [prompt])
+
+    mono_utils.generate_with_ai("prompt", use_cache=False, store=False)
+    mono_utils.generate_with_ai("prompt")
+    assert client.models.calls == 2
+    mono_utils.generate_with_ai("prompt")
+    assert client.models.calls == 2
+    mono_utils.get_response_cache().close()
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+import mono_utils
+
+OASIS_FORM = os.path.join(os.path.dirname(__file__), "..", "data", "pdf", "Oasis_Form.pdf")
+
+
+def test_chunks_are_byte_identical_across_runs():
+    pytest.importorskip("pymupdf")
+    first = mono_utils.split_pdf_pages(OASIS_FORM)
+    assert first == mono_utils.split_pdf_pages(OASIS_FORM)
+
+
+def test_non_object_json_counts_as_failed(monkeypatch):
+    responses = ['{"a": 1}', '["not", "a", "schema"]', '"text"', RuntimeError("503")]
+    monkeypatch.setattr(mono_utils, "generate_batch", lambda requests, *args, **kwargs: responses)
+    chunks = [((i, i), b"") for i in range(1, 5)]
+    done, failed = mono_utils._extract_page_ranges(chunks, concurrency=4)
+    assert done == [((1, 1), {"a": 1})]
+    assert [pages for pages, _ in failed] == [(2, 2), (3, 3), (4, 4)]
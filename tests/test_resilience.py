@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, Resilience, TokenBucket
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def failing(error):
+    def func():
+        raise error
+    return func
+
+
+def open_policy(**kwargs):
+    policy = Resilience(max_retries=0, base_delay=0, failure_threshold=1, recovery_seconds=0.05, **kwargs)
+    with pytest.raises(Unavailable):
+        policy.call(failing(Unavailable()))
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    return policy
+
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+def test_breaker_rejects_while_open_then_probe_closes_it():
+    policy = open_policy()
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: "ok")
+    time.sleep(0.06)
+    assert policy.call(lambda: "ok") == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens():
+    policy = open_policy()
+    time.sleep(0.06)
+    with pytest.raises(Unavailable):
+        policy.call(failing(Unavailable()))
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: "ok")
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker():
+    policy = open_policy()
+    time.sleep(0.06)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(policy.acall(asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert policy.call(lambda: "ok") == "ok"
+
+
+def test_interrupted_probe_does_not_wedge_the_breaker():
+    policy = open_policy()
+    time.sleep(0.06)
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(failing(KeyboardInterrupt()))
+    time.sleep(0.06)
+    assert policy.call(lambda: "ok") == "ok"
+
+
+def test_half_open_probe_that_never_reports_times_out():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()  # the probe, which never reports back
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_rate_limited_call_does_not_take_the_probe():
+    policy = open_policy(rate_per_second=0.01, burst=1)
+    policy.limiter._tokens = 0
+    time.sleep(0.06)
+    policy.timeout_seconds = 0.01
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda: "ok")
+    policy.timeout_seconds = 30
+    policy.limiter._tokens = 1
+    assert policy.call(lambda: "ok") == "ok"
+
+
+def test_non_retryable_errors_do_not_open_the_breaker():
+    policy = Resilience(max_retries=3, base_delay=0, failure_threshold=1)
+    with pytest.raises(BadRequest):
+        policy.call(failing(BadRequest()))
+    assert policy.retries == 0
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+# =============================================================================
+# RETRIES AND DEADLINES
+# =============================================================================
+
+def test_retries_transient_errors_until_success():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Unavailable()
+        return "ok"
+
+    policy = Resilience(max_retries=3, base_delay=0, failure_threshold=10)
+    assert policy.call(flaky) == "ok"
+    assert policy.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries():
+    policy = Resilience(max_retries=2, base_delay=0, failure_threshold=10)
+    with pytest.raises(Unavailable):
+        policy.call(failing(Unavailable()))
+    assert policy.retries == 2 and policy.failures == 1
+
+
+def test_backoff_is_capped_full_jitter():
+    policy = Resilience(base_delay=0.5, max_delay=2.0)
+    for attempt in range(8):
+        assert 0 <= policy.backoff(attempt) <= min(2.0, 0.5 * 2 ** attempt)
+
+
+def test_deadline_stops_retries():
+    policy = Resilience(max_retries=10, timeout_seconds=0.05, base_delay=1.0, max_delay=1.0, failure_threshold=100)
+    policy.backoff = lambda attempt: 1.0
+    with pytest.raises(DeadlineExceeded):
+        policy.call(failing(Unavailable()))
+
+
+def test_async_attempt_is_cut_off_at_the_deadline():
+    policy = Resilience(max_retries=0, timeout_seconds=0.05, failure_threshold=100)
+    with pytest.raises((asyncio.TimeoutError, DeadlineExceeded)):
+        asyncio.run(policy.acall(asyncio.sleep, 1))
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+def test_token_bucket_allows_a_burst_then_waits():
+    bucket = TokenBucket(rate=100, capacity=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0)
+    start = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_token_bucket_refunds_a_timed_out_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    # both refused calls returned their tokens, so one second refills one token
+    assert bucket._reserve() <= 1.0
@@ -0,0 +1,45 @@
+import numpy as np
+
+import streaming
+
+TEMPLATE = {"M1000. Pain Assessment": {"pain.level": "", "location": ""}, "Medications": {"list": ""}}
+
+
+def fake_encode(texts):
+    # one axis per keyword so routing is deterministic without a model
+    keywords = ["pain", "medication"]
+    return np.array([[1.0 + (k in text.lower()) * 5 for k in keywords] for text in texts], dtype=np.float32)
+
+
+def test_field_paths_keep_dotted_keys_whole():
+    assert list(streaming.iter_field_paths(TEMPLATE)) == [
+        ("M1000. Pain Assessment", "pain.level"),
+        ("M1000. Pain Assessment", "location"),
+        ("Medications", "list"),
+    ]
+
+
+def test_sections_are_top_level_keys(monkeypatch):
+    monkeypatch.setattr(streaming, "encode_sentences", fake_encode)
+    scores = streaming.get_ir_semantics(fake_encode(["pain"])[0], TEMPLATE, top_k=2)
+    assert [section for section, _ in scores] == ["M1000. Pain Assessment", "Medications"]
+
+
+def test_routing_embeds_the_template_once(monkeypatch):
+    monkeypatch.setattr(streaming, "encode_sentences", fake_encode)
+    monkeypatch.setattr(streaming, "_ir_semantics", streaming.OrderedDict())
+    calls = []
+    create = streaming.create_ir_semantics
+    monkeypatch.setattr(streaming, "create_ir_semantics", lambda ir: calls.append(ir) or create(ir))
+    routes = streaming.route_dialogues([["[Nurse]: any pain?"], ["[Nurse]: your medication list"]], TEMPLATE, top_k=1)
+    assert len(calls) == 1
+    assert routes == {"M1000. Pain Assessment": ["[Nurse]: any pain?"], "Medications": ["[Nurse]: your medication list"]}
+
+
+def test_template_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(streaming, "encode_sentences", fake_encode)
+    monkeypatch.setattr(streaming, "_ir_semantics", streaming.OrderedDict())
+    monkeypatch.setattr(streaming, "IR_SEMANTICS_CACHE_SIZE", 2)
+    for i in range(4):
+        streaming.create_ir_semantics({f"Section {i}": {"pain": ""}})
+    assert len(streaming._ir_semantics) == 2
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import streaming
+
+
+def one_hot(i, dim=64):
+    vec = np.zeros(dim, dtype=np.float32)
+    vec[i] = 1.0
+    return vec
+
+
+def test_max_active_must_be_positive():
+    with pytest.raises(ValueError):
+        streaming.DialogueSegmenter(max_active=0)
+
+
+def test_archive_is_bounded():
+    segmenter = streaming.DialogueSegmenter(incremental=True, max_active=2, max_archived=3)
+    for i in range(20):
+        segmenter.add(f"topic {i}", one_hot(i))
+    assert len(segmenter.dialogues) == 20
+    assert len(segmenter._active) == 2
+    assert len(segmenter._archive) == 3
+
+
+def test_archived_dialogue_is_referenced_back():
+    segmenter = streaming.DialogueSegmenter(incremental=True, max_active=1)
+    for i in range(3):
+        segmenter.add(f"topic {i}", one_hot(i))
+    event = segmenter.add("topic 0 again", one_hot(0))
+    assert (event.kind, event.dialogue) == (streaming.REFERENCE_BACK, 0)
@@ -0,0 +1,30 @@
+import mono_utils
+
+TEMPLATE = {"vitals": {"pulse": "", "weight": ""}}
+
+
+def test_unhashable_paths_are_skipped():
+    fields = [
+        {"path": ["vitals", "pulse"], "value": "72"},
+        {"path": {"vitals": "pulse"}, "value": "72"},
+        {"path": "vitals.weight", "value": "180 lb", "quote": "I weigh 180", "confidence": 0.9},
+    ]
+    result = mono_utils.apply_sparse_fields(TEMPLATE, fields)
+    assert result["filled_form"] == {"vitals": {"pulse": "", "weight": "180 lb"}}
+    assert list(result["citations"]) == ["vitals.weight"]
+
+
+def test_unknown_or_empty_entries_are_skipped():
+    paths = mono_utils.get_field_paths(TEMPLATE)
+    assert mono_utils._sparse_citation({"path": "vitals.height", "value": "6 ft"}, paths) is None
+    assert mono_utils._sparse_citation({"path": "vitals.pulse", "value": " "}, paths) is None
+    assert mono_utils._sparse_citation(["vitals.pulse", "72"], paths) is None
+
+
+def test_salvage_reports_cut_off_sections_out_of_template_order():
+    template = {"vitals": {"pulse": ""}, "meds": {"list": ""}}
+    response = ('{"fields": [{"path": "meds.list", "value": "aspirin", "quote": "aspirin", "confidence": 8}, '
+                '{"path": "vitals.pulse", "val')
+    result, missing = mono_utils.salvage_extraction(response, template, "sparse")
+    assert result["filled_form"]["meds"] == {"list": "aspirin"}
+    assert "vitals" in missing
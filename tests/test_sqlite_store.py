@@ -0,0 +1,23 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from response_cache import ResponseCache
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=10)
+    for i in range(10):
+        cache.put(str(i), f"value {i}")
+    assert cache.get("0") == "value 0"  # refresh the oldest entry
+    cache.put("10", "value 10")
+    assert cache.stats()["entries"] <= 10
+    assert cache.get("0") == "value 0"
+    assert cache.get("1") is None
+
+
+def test_embedding_cache_disk_tier_is_bounded(tmp_path):
+    cache = EmbeddingCache("model", str(tmp_path / "embeddings.sqlite"), max_memory_items=0, max_disk_items=10)
+    for i in range(25):
+        cache.encode([str(i)], lambda texts: np.ones((len(texts), 3), dtype=np.float32))
+    count = cache._db().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    assert count <= 10 and cache.stats()["disk_evictions"] == 25 - count
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from tolerant_json import IncrementalJSONParser, parse_partial
+
+DOCUMENT = '{"vitals": {"pulse": 72, "temp": 98.6, "note": "ok, \\"stable\\""}, "meds": ["aspirin", null, true]}'
+
+
+def test_complete_document():
+    root, events, complete = parse_partial(DOCUMENT)
+    assert complete and root == json.loads(DOCUMENT)
+    assert events[-1] == ((), root)
+    assert (("vitals", "pulse"), 72) in events and (("meds", 2), True) in events
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, len(DOCUMENT)])
+def test_chunked_feed_matches_whole_feed(size):
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(DOCUMENT), size):
+        events.extend(parser.feed(DOCUMENT[start:start + size]))
+    assert parser.complete and parser.root == json.loads(DOCUMENT)
+    assert events == parse_partial(DOCUMENT)[1]
+
+
+def test_truncated_mid_string():
+    root, events, complete = parse_partial('{"vitals": {"pulse": 72, "note": "sta')
+    assert not complete
+    assert root == {"vitals": {"pulse": 72}}
+    assert [path for path, _ in events] == [("vitals", "pulse")]
+
+
+def test_truncated_mid_number_keeps_it_pending():
+    root, events, complete = parse_partial('{"pulse": 72, "temp": 98.')
+    assert not complete and root == {"pulse": 72}
+    assert events == [(("pulse",), 72)]
+
+
+def test_truncated_mid_key():
+    root, events, complete = parse_partial('{"pulse": 72, "te')
+    assert not complete and root == {"pulse": 72}
+
+
+def test_trailing_commas():
+    root, _, complete = parse_partial('{"a": [1, 2,], "b": {"c": 3,},}')
+    assert complete and root == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_prose_and_code_fence_before_document():
+    root, _, complete = parse_partial('Sure! ```json\n{"a": 1}\n```')
+    assert complete and root == {"a": 1}
+
+
+def test_brackets_in_prose_before_document():
+    text = 'Here is the JSON [as requested]: {"fields": [{"path": "a.b", "value": "1"}]}'
+    root, _, complete = parse_partial(text)
+    assert complete and root == {"fields": [{"path": "a.b", "value": "1"}]}
+
+    parser = IncrementalJSONParser()
+    for ch in text:
+        parser.feed(ch)
+    assert parser.complete and parser.root == root
+
+
+def test_stops_at_syntax_error_keeping_earlier_values():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1, "b": 2 "c": 3}')
+    assert parser.error and parser.root == {"a": 1, "b": 2}
+
+
+def test_raw_control_characters_in_strings():
+    root, _, complete = parse_partial('{"note": "line one\nline two"}')
+    assert complete and root == {"note": "line one\nline two"}
@@ -457,10 +457,17 @@ def get_clinical_weights():
 # ERROR HANDLING AND LOGGING PATTERNS
 # =============================================================================
 
+_model_call_policy = None
+
+
 def safe_model_call(func, *args, **kwargs):
-    """Safely call model with error handling"""
+    """Safely call model with error handling, retries and a deadline from ProcessingConfig"""
+    global _model_call_policy
+    if _model_call_policy is None:
+        from resilience import Resilience
+        _model_call_policy = Resilience.from_config(load_config_from_env())
     try:
-        return func(*args, **kwargs)
+        return _model_call_policy.call(func, *args, **kwargs)
     except Exception as e:
         print(f"Error in model call: {e}")
         return None
@@ -0,0 +1,270 @@
+"""
+Resilience - retries, deadlines, rate limiting and circuit breaking for model calls
+
+One Resilience policy wraps every call to a provider:
+- a deadline for the whole call, retries included
+- jittered exponential backoff, only on rate limits (429), server errors (5xx),
+  timeouts and dropped connections
+- a token bucket that caps the request rate across threads and event loops
+- a circuit breaker that fails fast after repeated provider failures and lets
+  a single probe through once the recovery period has passed
+
+Usage:
+    policy = Resilience(max_retries=3, timeout_seconds=30, rate_per_second=5)
+    response = policy.call(client.models.generate_content, model=..., contents=...)
+    response = await policy.acall(client.aio.models.generate_content, model=..., contents=...)
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# exception class names used by the OpenAI / Google SDKs and requests for transient faults
+RETRYABLE_NAMES = {
+    "RateLimitError", "ServiceUnavailableError", "APIConnectionError", "APITimeoutError",
+    "Timeout", "ReadTimeout", "ConnectTimeout", "ServerError", "ResourceExhausted",
+    "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TryAgain"
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's deadline passed before an attempt succeeded"""
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider is failing; calls are rejected until the breaker recovers"""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK / HTTP error, if it carries one"""
+    for attr in ("status_code", "http_status", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is a transient provider fault worth retrying"""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return any(cls.__name__ in RETRYABLE_NAMES for cls in type(error).__mro__)
+
+
+# =============================================================================
+# RATE LIMITING
+# =============================================================================
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token; returns how long to wait before it is usable"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _release(self):
+        with self._lock:
+            self._tokens += 1
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a token is available; False (token returned) if that exceeds timeout"""
+        wait = self._reserve()
+        if timeout is not None and wait > timeout:
+            self._release()
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, timeout: float = None) -> bool:
+        wait = self._reserve()
+        if timeout is not None and wait > timeout:
+            self._release()
+            return False
+        if wait:
+            await asyncio.sleep(wait)
+        return True
+
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive provider failures.
+
+    While open every call is rejected. After `recovery_seconds` one probe call
+    is let through (half-open); its success closes the breaker, its failure
+    reopens it. A probe that never reports back (cancelled, interrupted) does
+    not wedge the breaker: after another `recovery_seconds` a new probe is let
+    through."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # opened_at doubles as the probe's start time while half-open
+            if self.state != self.CLOSED and now - self.opened_at >= self.recovery_seconds:
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def release(self):
+        """An admitted call ended without an outcome (cancelled or interrupted);
+        a half-open probe reopens the breaker rather than holding it half-open"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# =============================================================================
+# RETRY POLICY
+# =============================================================================
+
+class Resilience:
+    """Deadline + backoff + rate limit + circuit breaker around a provider call"""
+
+    def __init__(self, max_retries: int = 3, timeout_seconds: float = 30, base_delay: float = 0.5,
+                 max_delay: float = 8.0, rate_per_second: float = None, burst: float = None,
+                 failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self.breaker = CircuitBreaker(failure_threshold, recovery_seconds)
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, config, **kwargs) -> "Resilience":
+        """Policy from any config with max_retries and timeout_seconds (e.g. ProcessingConfig)"""
+        return cls(max_retries=config.max_retries, timeout_seconds=config.timeout_seconds, **kwargs)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _admit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("provider circuit is open; failing fast")
+
+    def _next_delay(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Delay before the next attempt, or re-raise if the call should give up"""
+        if not is_retryable(error):
+            # the provider answered (e.g. a 400), so it is not degraded
+            self.breaker.record_success()
+            self.failures += 1
+            raise error
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            self.failures += 1
+            raise error
+        delay = self.backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            self.failures += 1
+            raise DeadlineExceeded(f"deadline of {self.timeout_seconds}s exceeded") from error
+        self.retries += 1
+        return delay
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Call func with retries. The deadline is checked between attempts; bound a
+        single attempt with the client's own timeout."""
+        self.calls += 1
+        deadline = time.monotonic() + self.timeout_seconds
+        for attempt in range(self.max_retries + 1):
+            # wait for the limiter before taking a breaker slot, so a half-open
+            # probe is never admitted and then abandoned here
+            if self.limiter and not self.limiter.acquire(deadline - time.monotonic()):
+                raise DeadlineExceeded("deadline exceeded waiting for the rate limiter")
+            self._admit()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                delay = self._next_delay(error, attempt, deadline)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            time.sleep(delay)
+
+    async def acall(self, func: Callable, *args, **kwargs) -> Any:
+        """Await func(*args, **kwargs) with retries; each attempt is cut off at the deadline"""
+        self.calls += 1
+        deadline = time.monotonic() + self.timeout_seconds
+        for attempt in range(self.max_retries + 1):
+            if self.limiter and not await self.limiter.acquire_async(deadline - time.monotonic()):
+                raise DeadlineExceeded("deadline exceeded waiting for the rate limiter")
+            self._admit()
+            try:
+                result = await asyncio.wait_for(func(*args, **kwargs), max(0.0, deadline - time.monotonic()))
+            except Exception as error:
+                delay = self._next_delay(error, attempt, deadline)
+            except BaseException:
+                # e.g. CancelledError when the caller abandons the request
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "circuit": self.breaker.state,
+            "rejected": self.breaker.rejected
+        }